@@ -4,12 +4,17 @@ Main entry point for the dashboard application.
 """
 
 import streamlit as st
+import plotly.io as pio
+import importlib
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Serialize Plotly figures with orjson (Streamlit calls plotly.io.to_json on every chart)
+pio.json.config.default_engine = 'orjson'
+
 # Page configuration
 st.set_page_config(
     page_title="DeFi Yield Risk Analyzer",
@@ -58,6 +63,13 @@ with st.sidebar:
         ["🏠 Overview", "🔍 Pool Explorer", "📊 Risk Analysis", "📈 Historical Trends"]
     )
     
+    st.markdown("---")
+    
+    # Manual refresh - drop memoized query results and figures so pages reload from the database
+    if st.button("🔄 Refresh Data"):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+    
     st.markdown("---")
     st.markdown("""
     **About:**
@@ -67,17 +79,14 @@ with st.sidebar:
     """)
 
 
-# Import page modules
-from views import overview, pool_explorer, risk_analysis, historical_trends, methodology
+# Route to appropriate page. Page modules are imported on first visit only,
+# so a cold start does not pay for pages (and their dependencies) never shown.
+PAGE_MODULES = {
+    "🏠 Overview": "overview",
+    "🔍 Pool Explorer": "pool_explorer",
+    "📊 Risk Analysis": "risk_analysis",
+    "📈 Historical Trends": "historical_trends",
+    "📖 Methodology": "methodology",
+}
 
-# Route to appropriate page
-if page == "🏠 Overview":
-    overview.show()
-elif page == "🔍 Pool Explorer":
-    pool_explorer.show()
-elif page == "📊 Risk Analysis":
-    risk_analysis.show()
-elif page == "📈 Historical Trends":
-    historical_trends.show()
-elif page == "📖 Methodology":
-    methodology.show()
\ No newline at end of file
+importlib.import_module(f"views.{PAGE_MODULES[page]}").show()
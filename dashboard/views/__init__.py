@@ -1,4 +1,9 @@
-"""Dashboard views package"""
-from . import overview, pool_explorer, risk_analysis, historical_trends, methodology
+"""
+Dashboard views package
 
-__all__ = ['overview', 'pool_explorer', 'risk_analysis', 'historical_trends', 'methodology']
\ No newline at end of file
+Page modules are not imported here; app.py imports only the page being
+shown, so landing on a light page (e.g. Methodology) does not load pandas,
+Plotly or the database layer for the others.
+"""
+
+__all__ = ['overview', 'pool_explorer', 'risk_analysis', 'historical_trends', 'methodology']
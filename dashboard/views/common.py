@@ -0,0 +1,104 @@
+"""
+Shared cached queries used by several dashboard pages
+"""
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.database import get_engine, Pool, PoolMetric
+from src.risk_calculator import RiskCalculator
+
+# Scatter traces above this many points are thinned before plotting
+MAX_SCATTER_POINTS = 5000
+
+# Low-cardinality label columns stored as categoricals in the page frames
+CATEGORY_COLUMNS = ('project', 'chain', 'symbol')
+RISK_LEVEL_DTYPE = pd.CategoricalDtype(['Low', 'Medium', 'High'], ordered=True)
+
+
+@st.cache_resource(show_spinner=False)
+def get_risk_calculator():
+    """Single RiskCalculator shared across reruns and sessions"""
+    return RiskCalculator()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_dashboard_meta():
+    """
+    Load page-independent metadata in one round of queries.
+
+    Returns:
+        Dictionary with the latest metric date ('last_update') and the pools
+        with at least a week of metrics ('pools_with_history') as
+        (id, project, symbol, chain) tuples
+    """
+    with get_engine().connect() as conn:
+        last_update = conn.execute(select(func.max(PoolMetric.date))).scalar()
+
+        # Single GROUP BY instead of a count per pool
+        pools = conn.execute(
+            select(Pool.id, Pool.project, Pool.symbol, Pool.chain)
+            .join(PoolMetric, Pool.id == PoolMetric.pool_id)
+            .group_by(Pool.id)
+            .having(func.count(PoolMetric.id) >= 7)
+        ).all()
+
+    return {
+        'last_update': last_update,
+        'pools_with_history': [tuple(p) for p in pools],
+    }
+
+
+def as_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert label columns to categoricals in place.
+    
+    Filters, unique() and value_counts() then work on integer codes, and the
+    Arrow conversion behind st.dataframe dictionary-encodes them directly.
+    """
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    if 'risk_level' in df:
+        df['risk_level'] = df['risk_level'].astype(RISK_LEVEL_DTYPE)
+    return df
+
+
+def downcast_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store float64 columns as float32 in place.
+    
+    Scores, percentages and TVL are only displayed or averaged, so seven
+    significant digits are plenty and cached frames take half the memory.
+    """
+    float_columns = df.select_dtypes('float64').columns
+    df[float_columns] = df[float_columns].astype('float32')
+    return df
+
+
+def format_tvl(tvl: pd.Series) -> pd.Series:
+    """Format TVL as '$X.XM' below $1B and '$X.XXB' above, choosing the unit per row vectorized"""
+    formatted = np.where(
+        tvl < 1e9,
+        (tvl / 1e6).map('${:.1f}M'.format),
+        (tvl / 1e9).map('${:.2f}B'.format)
+    )
+    return pd.Series(formatted, index=tvl.index)
+
+
+def thin_for_plot(df: pd.DataFrame, max_points: int = MAX_SCATTER_POINTS) -> pd.DataFrame:
+    """
+    Cap the rows sent to a scatter trace.
+    
+    Uses a fixed-seed sample so the same points are drawn on every rerun and
+    the payload stays bounded as the pool universe grows.
+    """
+    if len(df) <= max_points:
+        return df
+    return df.sample(n=max_points, random_state=0)
@@ -3,36 +3,217 @@ Historical Trends page - Time series analysis
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+from sqlalchemy import select
 
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.database import get_session, Pool, PoolMetric
+from src.database import get_engine, PoolMetric
+from views.common import get_dashboard_meta
 
+# Series longer than this are decimated before plotting
+MAX_PLOT_POINTS = 1500
 
+
+def downsample_indices(values, n_out: int = 1000):
+    """
+    Pick row positions that preserve the visual shape of a series.
+    
+    Splits the series into n_out / 2 equal buckets and keeps the minimum and
+    maximum of each, so peaks and troughs survive the decimation.
+    
+    Args:
+        values: 1-D array of y values
+        n_out: Approximate number of points to keep
+        
+    Returns:
+        Sorted array of row positions
+    """
+    n = len(values)
+    if n <= MAX_PLOT_POINTS:
+        return np.arange(n)
+    
+    filled = np.nan_to_num(values)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = filled[start:end]
+        keep.append(start + int(np.argmin(bucket)))
+        keep.append(start + int(np.argmax(bucket)))
+    
+    return np.unique(keep)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_pool_history(pool_id: int, days: int = 90):
     """Load historical metrics for a pool"""
     from datetime import datetime, timedelta, timezone
     
-    session = get_session()
     cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
     
-    metrics = session.query(PoolMetric).filter(
+    # Select plain columns so rows skip ORM object hydration
+    stmt = select(
+        PoolMetric.date, PoolMetric.apy, PoolMetric.tvl_usd
+    ).where(
         PoolMetric.pool_id == pool_id,
         PoolMetric.date >= cutoff_date
-    ).order_by(PoolMetric.date).all()
+    ).order_by(PoolMetric.date)
+    
+    with get_engine().connect() as conn:
+        rows = conn.execute(stmt).all()
+    
+    return pd.DataFrame.from_records(rows, columns=['date', 'apy', 'tvl_usd'])
+
+
+def trailing_mean(values, window: int):
+    """
+    Trailing moving average, equivalent to rolling(window, min_periods=1).mean().
+    
+    Uses cumulative sums so the whole series is averaged in a few vectorized
+    passes. NaN values are skipped the same way pandas skips them.
+    
+    Args:
+        values: 1-D float array
+        window: Number of trailing observations to average
+        
+    Returns:
+        Array of moving averages (NaN where the window holds no values)
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    
+    with np.errstate(invalid='ignore'):
+        return (sums[end] - sums[start]) / (counts[end] - counts[start])
+
+
+def summarize(values):
+    """
+    Summary statistics for a series, matching pandas' NaN-skipping defaults.
+    
+    Min, median and max come from one quantile call over the array.
+    
+    Args:
+        values: 1-D float array
+        
+    Returns:
+        Tuple of (min, max, mean, median, sample std dev)
+    """
+    low, median, high = np.nanquantile(values, [0.0, 0.5, 1.0])
+    return low, high, np.nanmean(values), median, np.nanstd(values, ddof=1)
+
+
+def format_usd(values):
+    """
+    Format USD amounts with K/M/B suffixes.
+    
+    Scale and suffix are picked for the whole array at once; only the final
+    string conversion runs per value.
+    
+    Args:
+        values: Sequence of USD amounts
+        
+    Returns:
+        List of formatted strings (e.g. '$12.3M', '$1.25B')
+    """
+    v = np.asarray(values, dtype=float)
+    buckets = [v < 1e6, v < 1e9]
+    
+    scaled = np.select(buckets, [v / 1e3, v / 1e6], default=v / 1e9)
+    suffixes = np.select(buckets, ['K', 'M'], default='B')
+    decimals = np.where(v < 1e9, 1, 2)
+    
+    return [f"${x:.{d}f}{u}" for x, d, u in zip(scaled, decimals, suffixes)]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def pool_history_csv(pool_id: int, days: int) -> bytes:
+    """Encoded CSV export of a pool's history, built once per pool and range"""
+    return load_pool_history(pool_id, days=days).to_csv(index=False).encode()
+
+
+# Figures are immutable once built, so they are cached as shared resources
+# (no pickling) and a slider move back to a seen range skips construction.
+@st.cache_resource(ttl=600, max_entries=64, show_spinner=False)
+def build_apy_figure(pool_id: int, days: int):
+    """Build the APY time-series figure for a pool"""
+    df = load_pool_history(pool_id, days=days)
+    
+    # Moving average uses the full series; only the plotted points are decimated
+    df['apy_ma7'] = trailing_mean(df['apy'].to_numpy(dtype=float), 7)
+    apy_plot = df.iloc[downsample_indices(df['apy'].to_numpy())]
+    
+    fig = go.Figure()
+    
+    # APY line
+    fig.add_trace(go.Scattergl(
+        x=apy_plot['date'],
+        y=apy_plot['apy'],
+        mode='lines',
+        name='APY',
+        line=dict(color='#3498db', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(52, 152, 219, 0.1)'
+    ))
+    
+    # Add moving average
+    fig.add_trace(go.Scattergl(
+        x=apy_plot['date'],
+        y=apy_plot['apy_ma7'],
+        mode='lines',
+        name='7-day MA',
+        line=dict(color='#e74c3c', width=1, dash='dash')
+    ))
+    
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="APY (%)",
+        hovermode='x unified',
+        height=400,
+        uirevision='apy-chart',  # Keep zoom/pan state across reruns
+        transition={'duration': 0}
+    )
+    
+    return fig
+
+
+@st.cache_resource(ttl=600, max_entries=64, show_spinner=False)
+def build_tvl_figure(pool_id: int, days: int):
+    """Build the TVL time-series figure for a pool"""
+    df = load_pool_history(pool_id, days=days)
+    
+    tvl_plot = df.iloc[downsample_indices(df['tvl_usd'].to_numpy())]
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scattergl(
+        x=tvl_plot['date'],
+        y=tvl_plot['tvl_usd'],
+        mode='lines',
+        name='TVL',
+        line=dict(color='#2ecc71', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(46, 204, 113, 0.1)'
+    ))
     
-    data = [{
-        'date': m.date,
-        'apy': m.apy,
-        'tvl_usd': m.tvl_usd
-    } for m in metrics]
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="TVL (USD)",
+        hovermode='x unified',
+        height=400,
+        uirevision='tvl-chart',
+        transition={'duration': 0}
+    )
     
-    return pd.DataFrame(data)
+    return fig
 
 
 def show():
@@ -40,29 +221,22 @@ def show():
     st.title("📈 Historical Trends")
     st.markdown("Analyze how yields and liquidity have evolved over time")
     
-    session = get_session()
-    
     # Get pools with sufficient data
-    pools = session.query(Pool).all()
-    pools_with_data = []
-    
-    for pool in pools:
-        metric_count = session.query(PoolMetric).filter_by(pool_id=pool.id).count()
-        if metric_count >= 7:
-            pools_with_data.append(pool)
+    pools_with_data = get_dashboard_meta()['pools_with_history']
     
     if len(pools_with_data) == 0:
         st.error("No pools with historical data available.")
         return
     
     # Pool selector
-    pool_options = {f"{p.project} - {p.symbol} ({p.chain})": p for p in pools_with_data}
+    pool_options = {f"{project} - {symbol} ({chain})": (pool_id, project, symbol)
+                    for pool_id, project, symbol, chain in pools_with_data}
     selected_pool_name = st.selectbox(
         "Select Pool",
         options=list(pool_options.keys())
     )
     
-    selected_pool = pool_options[selected_pool_name]
+    selected_pool_id, selected_project, selected_symbol = pool_options[selected_pool_name]
     
     # Time range selector
     col1, col2 = st.columns([3, 1])
@@ -83,18 +257,24 @@ def show():
     
     # Load data
     with st.spinner("Loading historical data..."):
-        df = load_pool_history(selected_pool.id, days=time_range)
+        df = load_pool_history(selected_pool_id, days=time_range)
     
     if len(df) == 0:
         st.warning("No historical data available for this pool.")
         return
     
+    # Statistics are computed once and shared by the metrics and tables below
+    apy_arr = df['apy'].to_numpy(dtype=float)
+    tvl_arr = df['tvl_usd'].to_numpy(dtype=float)
+    apy_min, apy_max, apy_mean, apy_median, apy_std = summarize(apy_arr)
+    tvl_min, tvl_max, tvl_mean, tvl_median, _ = summarize(tvl_arr)
+    
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        current_apy = df.iloc[-1]['apy']
-        prev_apy = df.iloc[0]['apy']
+        current_apy = apy_arr[-1]
+        prev_apy = apy_arr[0]
         apy_change = current_apy - prev_apy
         st.metric(
             "Current APY",
@@ -103,21 +283,19 @@ def show():
         )
     
     with col2:
-        avg_apy = df['apy'].mean()
         st.metric(
             "Average APY",
-            f"{avg_apy:.2f}%"
+            f"{apy_mean:.2f}%"
         )
     
     with col3:
-        apy_volatility = df['apy'].std()
         st.metric(
             "APY Volatility",
-            f"{apy_volatility:.2f}%"
+            f"{apy_std:.2f}%"
         )
     
     with col4:
-        current_tvl = df.iloc[-1]['tvl_usd']
+        current_tvl = tvl_arr[-1]
         tvl_display = f"${current_tvl/1e6:.1f}M" if current_tvl < 1e9 else f"${current_tvl/1e9:.2f}B"
         st.metric(
             "Current TVL",
@@ -129,62 +307,13 @@ def show():
     # APY Chart
     st.subheader("📊 APY Over Time")
     
-    fig = go.Figure()
-    
-    # APY line
-    fig.add_trace(go.Scatter(
-        x=df['date'],
-        y=df['apy'],
-        mode='lines',
-        name='APY',
-        line=dict(color='#3498db', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(52, 152, 219, 0.1)'
-    ))
-    
-    # Add moving average
-    df['apy_ma7'] = df['apy'].rolling(window=7, min_periods=1).mean()
-    fig.add_trace(go.Scatter(
-        x=df['date'],
-        y=df['apy_ma7'],
-        mode='lines',
-        name='7-day MA',
-        line=dict(color='#e74c3c', width=1, dash='dash')
-    ))
-    
-    fig.update_layout(
-        xaxis_title="Date",
-        yaxis_title="APY (%)",
-        hovermode='x unified',
-        height=400
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_apy_figure(selected_pool_id, time_range), use_container_width=True)
     
     # TVL Chart (if enabled)
     if show_tvl:
         st.subheader("💰 TVL Over Time")
         
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['tvl_usd'],
-            mode='lines',
-            name='TVL',
-            line=dict(color='#2ecc71', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(46, 204, 113, 0.1)'
-        ))
-        
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="TVL (USD)",
-            hovermode='x unified',
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(build_tvl_figure(selected_pool_id, time_range), use_container_width=True)
     
     st.markdown("---")
     
@@ -197,11 +326,11 @@ def show():
         stats_df = pd.DataFrame({
             'Metric': ['Min', 'Max', 'Mean', 'Median', 'Std Dev'],
             'Value': [
-                f"{df['apy'].min():.2f}%",
-                f"{df['apy'].max():.2f}%",
-                f"{df['apy'].mean():.2f}%",
-                f"{df['apy'].median():.2f}%",
-                f"{df['apy'].std():.2f}%"
+                f"{apy_min:.2f}%",
+                f"{apy_max:.2f}%",
+                f"{apy_mean:.2f}%",
+                f"{apy_median:.2f}%",
+                f"{apy_std:.2f}%"
             ]
         })
         
@@ -210,22 +339,11 @@ def show():
     with col2:
         st.subheader("💎 TVL Statistics")
         
-        def format_usd(value):
-            if value < 1e6:
-                return f"${value/1e3:.1f}K"
-            elif value < 1e9:
-                return f"${value/1e6:.1f}M"
-            else:
-                return f"${value/1e9:.2f}B"
-        
         stats_df = pd.DataFrame({
             'Metric': ['Min', 'Max', 'Mean', 'Median', 'Change'],
             'Value': [
-                format_usd(df['tvl_usd'].min()),
-                format_usd(df['tvl_usd'].max()),
-                format_usd(df['tvl_usd'].mean()),
-                format_usd(df['tvl_usd'].median()),
-                f"{((df.iloc[-1]['tvl_usd'] / df.iloc[0]['tvl_usd']) - 1) * 100:+.1f}%"
+                *format_usd([tvl_min, tvl_max, tvl_mean, tvl_median]),
+                f"{((tvl_arr[-1] / tvl_arr[0]) - 1) * 100:+.1f}%"
             ]
         })
         
@@ -233,10 +351,9 @@ def show():
     
     # Export option
     st.markdown("---")
-    csv = df.to_csv(index=False)
     st.download_button(
         label="📥 Export Historical Data",
-        data=csv,
-        file_name=f"{selected_pool.project}_{selected_pool.symbol}_history.csv",
+        data=pool_history_csv(selected_pool_id, time_range),
+        file_name=f"{selected_project}_{selected_symbol}_history.csv",
         mime="text/csv"
     )
\ No newline at end of file
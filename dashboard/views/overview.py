@@ -3,32 +3,59 @@ Overview page - Market summary and top opportunities
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.database import get_session, Pool, PoolRiskScore, PoolMetric
-from src.risk_calculator import RiskCalculator
+from views.common import as_categories, downcast_floats, get_dashboard_meta, get_risk_calculator
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_data():
     """Load summary data"""
-    calculator = RiskCalculator()
-    return calculator.get_risk_summary()
+    df = get_risk_calculator().get_risk_summary()
+    
+    # Risk-adjusted return (APY / Risk Score), computed once per data refresh
+    df['risk_adjusted_return'] = df['apy_30d'] / (df['risk_score'] + 1)
+    
+    return downcast_floats(as_categories(df))
+
+
+def top_n(df: pd.DataFrame, column: str, n: int = 10, largest: bool = True) -> pd.DataFrame:
+    """
+    Rows with the n largest (or smallest) values of a column, best first.
+    
+    Uses a partial sort (argpartition) so only the selected rows get sorted.
+    """
+    values = df[column].to_numpy()
+    if largest:
+        values = -values
+    
+    if len(values) > n:
+        df = df.iloc[np.argpartition(values, n - 1)[:n]]
+    
+    return df.sort_values(column, ascending=not largest)
 
 
 def show():
     """Render overview page"""
     st.title("🏠 DeFi Yield Market Overview")
     
-    # Load data
+    # Load data - the footer metadata is independent of the summary, so it is
+    # fetched on a worker thread (with its own session) while the summary loads
     with st.spinner("Loading data..."):
-        df = load_data()
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+            meta_future = executor.submit(get_dashboard_meta)
+            df = load_data()
     
     if len(df) == 0:
         st.error("No data available. Please run data collection first.")
@@ -76,8 +103,9 @@ def show():
     with col1:
         st.subheader("📊 Risk Distribution")
         
-        # Risk level pie chart
-        risk_counts = df['risk_level'].value_counts()
+        # Risk level pie chart - risk_level is a categorical with every level,
+        # so drop levels no pool falls in rather than draw empty slices
+        risk_counts = df['risk_level'].value_counts()[lambda counts: counts > 0]
         fig = px.pie(
             values=risk_counts.values,
             names=risk_counts.index,
@@ -85,9 +113,9 @@ def show():
             color_discrete_map={'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'},
             hole=0.4
         )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(showlegend=False, height=300)
-        st.plotly_chart(fig, use_container_width=True)
+        fig.update_traces(textposition='inside', textinfo='percent+label', sort=False)
+        fig.update_layout(showlegend=False, height=300, transition={'duration': 0})
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
     
     with col2:
         st.subheader("🔗 Top Chains by Pool Count")
@@ -106,9 +134,10 @@ def show():
             xaxis_title="Number of Pools",
             yaxis_title="",
             height=300,
-            coloraxis_showscale=False
+            coloraxis_showscale=False,
+            transition={'duration': 0}
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
     
     st.markdown("---")
     
@@ -127,9 +156,10 @@ def show():
             'risk_score': 'Risk Score (Lower = Safer)',
             'apy_30d': 'APY (%)',
             'tvl_30d': 'TVL (USD)'
-        }
+        },
+        render_mode='webgl'
     )
-    fig.update_layout(height=500)
+    fig.update_layout(height=500, transition={'duration': 0})
     st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
@@ -141,15 +171,13 @@ def show():
         st.subheader("💎 Best Risk-Adjusted Returns")
         st.caption("High APY, Low Risk")
         
-        # Calculate risk-adjusted return (APY / Risk Score)
-        df['risk_adjusted_return'] = df['apy_30d'] / (df['risk_score'] + 1)
-        top_adjusted = df.nlargest(10, 'risk_adjusted_return')[
+        top_adjusted = top_n(df, 'risk_adjusted_return')[
             ['project', 'symbol', 'chain', 'apy_30d', 'risk_score', 'risk_level']
         ].copy()
         
         # Format for display
-        top_adjusted['apy_30d'] = top_adjusted['apy_30d'].apply(lambda x: f"{x:.2f}%")
-        top_adjusted['risk_score'] = top_adjusted['risk_score'].apply(lambda x: f"{x:.1f}")
+        top_adjusted['apy_30d'] = top_adjusted['apy_30d'].map('{:.2f}%'.format)
+        top_adjusted['risk_score'] = top_adjusted['risk_score'].map('{:.1f}'.format)
         top_adjusted.columns = ['Project', 'Symbol', 'Chain', 'APY', 'Risk', 'Risk Level']
         
         st.dataframe(
@@ -163,13 +191,13 @@ def show():
         st.caption("Low Risk, High Liquidity")
         
         # Safest pools with TVL > $10M
-        safe_liquid = df[df['tvl_30d'] > 10_000_000].nsmallest(10, 'risk_score')[
+        safe_liquid = top_n(df[df['tvl_30d'] > 10_000_000], 'risk_score', largest=False)[
             ['project', 'symbol', 'chain', 'apy_30d', 'tvl_30d', 'risk_level']
         ].copy()
         
         # Format for display
-        safe_liquid['apy_30d'] = safe_liquid['apy_30d'].apply(lambda x: f"{x:.2f}%")
-        safe_liquid['tvl_30d'] = safe_liquid['tvl_30d'].apply(lambda x: f"${x/1e6:.1f}M")
+        safe_liquid['apy_30d'] = safe_liquid['apy_30d'].map('{:.2f}%'.format)
+        safe_liquid['tvl_30d'] = (safe_liquid['tvl_30d'] / 1e6).map('${:.1f}M'.format)
         safe_liquid.columns = ['Project', 'Symbol', 'Chain', 'APY', 'TVL', 'Risk Level']
         
         st.dataframe(
@@ -180,7 +208,6 @@ def show():
     
     # Footer
     st.markdown("---")
-    session = get_session()
-    last_update = session.query(PoolMetric).order_by(PoolMetric.date.desc()).first()
+    last_update = meta_future.result()['last_update']
     if last_update:
-        st.caption(f"Last updated: {last_update.date.strftime('%Y-%m-%d %H:%M UTC')}")
\ No newline at end of file
+        st.caption(f"Last updated: {last_update.strftime('%Y-%m-%d %H:%M UTC')}")
\ No newline at end of file
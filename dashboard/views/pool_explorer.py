@@ -3,21 +3,52 @@ Pool Explorer page - Filter and search pools
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
+from sqlalchemy import func, select
 
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.database import get_session, Pool, PoolRiskScore
-from src.risk_calculator import RiskCalculator
+from src.database import get_engine, PoolRiskScore
+from views.common import as_categories, downcast_floats, format_tvl, get_risk_calculator
 
+# Sort selector label -> (column, ascending)
+SORT_OPTIONS = {
+    'APY (High to Low)': ('apy_30d', False),
+    'APY (Low to High)': ('apy_30d', True),
+    'Risk (Low to High)': ('risk_score', True),
+    'Risk (High to Low)': ('risk_score', False),
+    'TVL (High to Low)': ('tvl_30d', False),
+    'TVL (Low to High)': ('tvl_30d', True),
+}
 
+
+@st.cache_data(ttl=300, show_spinner=False)
 def load_data():
     """Load pool data with risk scores"""
-    calculator = RiskCalculator()
-    return calculator.get_risk_summary()
+    return downcast_floats(as_categories(get_risk_calculator().get_risk_summary()))
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_apy_bounds():
+    """Min/max 30-day mean APY for the slider bounds, computed in SQL"""
+    with get_engine().connect() as conn:
+        min_apy, max_apy = conn.execute(select(
+            func.min(PoolRiskScore.apy_mean_30d),
+            func.max(PoolRiskScore.apy_mean_30d)
+        )).one()
+    
+    # Round through float32 like the loaded frame, so the default range
+    # still includes the pools sitting exactly on either bound
+    return float(np.float32(min_apy)), float(np.float32(max_apy))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def to_csv(df: pd.DataFrame) -> bytes:
+    """Encoded CSV export, rebuilt only when the filtered rows change"""
+    return df.to_csv(index=False).encode()
 
 
 def show():
@@ -52,7 +83,7 @@ def show():
     )
     
     # APY range
-    min_apy, max_apy = float(df['apy_30d'].min()), float(df['apy_30d'].max())
+    min_apy, max_apy = get_apy_bounds()
     apy_range = st.sidebar.slider(
         "APY Range (%)",
         min_value=min_apy,
@@ -82,55 +113,44 @@ def show():
         help="Lower score = Lower risk"
     )
     
-    # Apply filters
-    filtered_df = df.copy()
+    # Apply filters as one combined mask, indexing the frame once
+    mask = (
+        df['risk_level'].isin(risk_levels) &
+        df['apy_30d'].between(*apy_range) &
+        df['tvl_30d'].between(10**tvl_range_log[0], 10**tvl_range_log[1]) &
+        df['risk_score'].between(*risk_range)
+    )
     
     if selected_chain != 'All':
-        filtered_df = filtered_df[filtered_df['chain'] == selected_chain]
+        mask &= df['chain'] == selected_chain
     
     if selected_protocol != 'All':
-        filtered_df = filtered_df[filtered_df['project'] == selected_protocol]
-    
-    filtered_df = filtered_df[filtered_df['risk_level'].isin(risk_levels)]
-    filtered_df = filtered_df[
-        (filtered_df['apy_30d'] >= apy_range[0]) &
-        (filtered_df['apy_30d'] <= apy_range[1])
-    ]
-    filtered_df = filtered_df[
-        (filtered_df['tvl_30d'] >= 10**tvl_range_log[0]) &
-        (filtered_df['tvl_30d'] <= 10**tvl_range_log[1])
-    ]
-    filtered_df = filtered_df[
-        (filtered_df['risk_score'] >= risk_range[0]) &
-        (filtered_df['risk_score'] <= risk_range[1])
-    ]
-    
-    # Summary metrics
+        mask &= df['project'] == selected_protocol
+    
+    filtered_df = df[mask]
+    
+    # Summary metrics, reduced in one pass over the filtered rows
+    if len(filtered_df) > 0:
+        summary = filtered_df.agg({'apy_30d': 'mean', 'risk_score': 'mean', 'tvl_30d': 'sum'})
+        avg_apy = f"{summary['apy_30d']:.2f}%"
+        avg_risk = f"{summary['risk_score']:.1f}"
+        total_tvl = f"${summary['tvl_30d']/1e9:.2f}B"
+    else:
+        avg_apy = avg_risk = total_tvl = "N/A"
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric("Pools Found", len(filtered_df))
     
     with col2:
-        if len(filtered_df) > 0:
-            avg_apy = filtered_df['apy_30d'].mean()
-            st.metric("Avg APY", f"{avg_apy:.2f}%")
-        else:
-            st.metric("Avg APY", "N/A")
+        st.metric("Avg APY", avg_apy)
     
     with col3:
-        if len(filtered_df) > 0:
-            avg_risk = filtered_df['risk_score'].mean()
-            st.metric("Avg Risk Score", f"{avg_risk:.1f}")
-        else:
-            st.metric("Avg Risk Score", "N/A")
+        st.metric("Avg Risk Score", avg_risk)
     
     with col4:
-        if len(filtered_df) > 0:
-            total_tvl = filtered_df['tvl_30d'].sum()
-            st.metric("Total TVL", f"${total_tvl/1e9:.2f}B")
-        else:
-            st.metric("Total TVL", "N/A")
+        st.metric("Total TVL", total_tvl)
     
     st.markdown("---")
     
@@ -145,54 +165,27 @@ def show():
         st.subheader(f"📋 Pool List ({len(filtered_df)} pools)")
     
     with col2:
-        sort_by = st.selectbox(
-            "Sort by",
-            ['APY (High to Low)', 'APY (Low to High)', 
-             'Risk (Low to High)', 'Risk (High to Low)',
-             'TVL (High to Low)', 'TVL (Low to High)']
-        )
-    
-    # Apply sorting
-    if sort_by == 'APY (High to Low)':
-        filtered_df = filtered_df.sort_values('apy_30d', ascending=False)
-    elif sort_by == 'APY (Low to High)':
-        filtered_df = filtered_df.sort_values('apy_30d', ascending=True)
-    elif sort_by == 'Risk (Low to High)':
-        filtered_df = filtered_df.sort_values('risk_score', ascending=True)
-    elif sort_by == 'Risk (High to Low)':
-        filtered_df = filtered_df.sort_values('risk_score', ascending=False)
-    elif sort_by == 'TVL (High to Low)':
-        filtered_df = filtered_df.sort_values('tvl_30d', ascending=False)
-    elif sort_by == 'TVL (Low to High)':
-        filtered_df = filtered_df.sort_values('tvl_30d', ascending=True)
-    
-    # Prepare display dataframe
-    display_df = filtered_df.copy()
-    display_df['apy_display'] = display_df['apy_30d'].apply(lambda x: f"{x:.2f}%")
-    display_df['tvl_display'] = display_df['tvl_30d'].apply(
-        lambda x: f"${x/1e6:.1f}M" if x < 1e9 else f"${x/1e9:.2f}B"
-    )
-    display_df['risk_display'] = display_df['risk_score'].apply(lambda x: f"{x:.1f}")
-    
-    # Color-code risk levels
-    def risk_color(risk_level):
-        colors = {'Low': '🟢', 'Medium': '🟡', 'High': '🔴'}
-        return colors.get(risk_level, '')
-    
-    display_df['risk_indicator'] = display_df['risk_level'].apply(risk_color)
-    
-    # Select columns for display
-    table_df = display_df[[
-        'project', 'symbol', 'chain', 
-        'apy_display', 'tvl_display', 
-        'risk_display', 'risk_indicator', 'risk_level'
-    ]].copy()
-    
-    table_df.columns = [
-        'Project', 'Symbol', 'Chain', 
-        'APY', 'TVL', 
-        'Risk Score', '', 'Risk Level'
-    ]
+        sort_by = st.selectbox("Sort by", list(SORT_OPTIONS))
+    
+    # Apply sorting: argsort the one sort column, then gather the rows once
+    # (negating for descending keeps NaN last and ties in their original order)
+    sort_column, ascending = SORT_OPTIONS[sort_by]
+    values = filtered_df[sort_column].to_numpy()
+    order = np.argsort(values if ascending else -values, kind='stable')
+    filtered_df = filtered_df.iloc[order]
+    
+    # Build the display table directly from the formatted columns
+    table_df = pd.DataFrame({
+        'Project': filtered_df['project'],
+        'Symbol': filtered_df['symbol'],
+        'Chain': filtered_df['chain'],
+        'APY': filtered_df['apy_30d'].map('{:.2f}%'.format),
+        'TVL': format_tvl(filtered_df['tvl_30d']),
+        'Risk Score': filtered_df['risk_score'].map('{:.1f}'.format),
+        # Color-code risk levels (every category is mapped, so no fill is needed)
+        '': filtered_df['risk_level'].map({'Low': '🟢', 'Medium': '🟡', 'High': '🔴'}),
+        'Risk Level': filtered_df['risk_level']
+    })
     
     # Display table with formatting
     st.dataframe(
@@ -212,10 +205,9 @@ def show():
     
     with col2:
         # CSV export
-        csv = filtered_df.to_csv(index=False)
         st.download_button(
             label="📥 Export CSV",
-            data=csv,
+            data=to_csv(filtered_df),
             file_name="defi_pools_export.csv",
             mime="text/csv"
         )
\ No newline at end of file
@@ -3,56 +3,254 @@ Risk Analysis page - Deep dive into risk metrics
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from sqlalchemy import func, select
 
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.database import get_session, Pool, PoolRiskScore
-from src.risk_calculator import RiskCalculator
+from src.database import get_engine, Pool, PoolRiskScore
+from src.risk_calculator import RISK_LEVEL
+from views.common import as_categories, downcast_floats, format_tvl, thin_for_plot
 
+RISK_COLORS = {'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'}
 
+
+@st.cache_data(ttl=300, show_spinner=False)
 def load_detailed_data():
     """Load detailed risk data"""
-    session = get_session()
-    
-    results = session.query(
+    query = select(
         Pool.project,
         Pool.symbol,
         Pool.chain,
-        PoolRiskScore.apy_mean_30d,
-        PoolRiskScore.apy_volatility_30d,
-        PoolRiskScore.tvl_mean_30d,
-        PoolRiskScore.tvl_volatility_30d,
+        PoolRiskScore.apy_mean_30d.label('apy_mean'),
+        PoolRiskScore.apy_volatility_30d.label('apy_volatility'),
+        PoolRiskScore.tvl_mean_30d.label('tvl_mean'),
+        PoolRiskScore.tvl_volatility_30d.label('tvl_volatility'),
         PoolRiskScore.liquidity_score,
         PoolRiskScore.stability_score,
-        PoolRiskScore.composite_risk_score
+        PoolRiskScore.composite_risk_score.label('risk_score'),
+        RISK_LEVEL  # classified in SQL, like the other pages
     ).join(
         PoolRiskScore, Pool.id == PoolRiskScore.pool_id
-    ).all()
+    )
     
-    df = pd.DataFrame(results, columns=[
-        'project', 'symbol', 'chain',
-        'apy_mean', 'apy_volatility', 'tvl_mean', 'tvl_volatility',
-        'liquidity_score', 'stability_score', 'risk_score'
+    # Build the frame straight from the cursor instead of ORM rows
+    df = pd.read_sql(query, get_engine())
+    
+    return downcast_floats(as_categories(df))
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_protocol_aggregates(protocols: tuple):
+    """Per-protocol averages (and total TVL) for the selected protocols, aggregated in SQL"""
+    with get_engine().connect() as conn:
+        results = conn.execute(select(
+            Pool.project,
+            func.avg(PoolRiskScore.apy_mean_30d),
+            func.avg(PoolRiskScore.composite_risk_score),
+            func.avg(PoolRiskScore.liquidity_score),
+            func.avg(PoolRiskScore.stability_score),
+            func.sum(PoolRiskScore.tvl_mean_30d)
+        ).join(
+            PoolRiskScore, Pool.id == PoolRiskScore.pool_id
+        ).where(
+            Pool.project.in_(protocols)
+        ).group_by(Pool.project).order_by(Pool.project)).all()
+    
+    return pd.DataFrame(results, columns=[
+        'project', 'apy_mean', 'risk_score', 'liquidity_score', 'stability_score', 'tvl_mean'
     ])
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_chain_aggregates():
+    """Per-chain average risk/APY and total TVL, aggregated in SQL"""
+    avg_risk = func.avg(PoolRiskScore.composite_risk_score)
+    
+    with get_engine().connect() as conn:
+        results = conn.execute(select(
+            Pool.chain,
+            avg_risk,
+            func.avg(PoolRiskScore.apy_mean_30d),
+            func.sum(PoolRiskScore.tvl_mean_30d)
+        ).join(
+            PoolRiskScore, Pool.id == PoolRiskScore.pool_id
+        ).group_by(Pool.chain).order_by(avg_risk)).all()
+    
+    return pd.DataFrame(results, columns=['chain', 'risk_score', 'apy_mean', 'tvl_mean'])
+
+
+def fixed_xbins(values: pd.Series, bins: int = 50) -> dict:
+    """Histogram bin spec shared by every trace, so Plotly doesn't auto-bin each one client-side"""
+    edges = np.histogram_bin_edges(values.dropna(), bins=bins)
+    return dict(start=edges[0], end=edges[-1], size=edges[1] - edges[0])
+
+
+# Figures only depend on the cached frames above (and, for the radar, the
+# protocol selection), so they are cached as shared resources: a rerun caused
+# by any widget reuses every tab's figures instead of rebuilding all of them.
+@st.cache_resource(ttl=300, show_spinner=False)
+def build_breakdown_figures():
+    """Build the Risk Breakdown tab figures: component scatter, score box plots and volatility histograms"""
+    df = load_detailed_data()
+    
+    # Scatter: Liquidity vs Stability
+    scatter = px.scatter(
+        thin_for_plot(df),
+        x='stability_score',
+        y='liquidity_score',
+        size='tvl_mean',
+        color='risk_level',
+        hover_data=['project', 'symbol', 'risk_score'],
+        color_discrete_map=RISK_COLORS,
+        labels={
+            'stability_score': 'Stability Score',
+            'liquidity_score': 'Liquidity Score'
+        },
+        title="Liquidity vs Stability Analysis",
+        render_mode='webgl'
+    )
+    scatter.add_shape(
+        type='line',
+        x0=0, y0=0, x1=100, y1=100,
+        line=dict(color='gray', dash='dash')
+    )
+    scatter.update_layout(height=500)
+    
+    # Box plots for scores
+    box = go.Figure()
+    box.add_trace(go.Box(y=df['liquidity_score'], name='Liquidity', marker_color='#3498db'))
+    box.add_trace(go.Box(y=df['stability_score'], name='Stability', marker_color='#9b59b6'))
+    box.add_trace(go.Box(y=df['risk_score'], name='Composite Risk', marker_color='#e74c3c'))
+    
+    box.update_layout(
+        showlegend=False,
+        yaxis_title="Score",
+        height=400
+    )
+    
+    # Volatility histograms
+    apy_hist = px.histogram(
+        df,
+        x='apy_volatility',
+        color='risk_level',
+        color_discrete_map=RISK_COLORS,
+        labels={'apy_volatility': 'APY Standard Deviation (%)'}
+    )
+    apy_hist.update_traces(xbins=fixed_xbins(df['apy_volatility']))
+    apy_hist.update_layout(showlegend=True, height=300)
+    
+    tvl_hist = px.histogram(
+        df,
+        x='tvl_volatility',
+        color='risk_level',
+        color_discrete_map=RISK_COLORS,
+        labels={'tvl_volatility': 'TVL Coefficient of Variation (%)'}
+    )
+    tvl_hist.update_traces(xbins=fixed_xbins(df['tvl_volatility']))
+    tvl_hist.update_layout(showlegend=True, height=300)
+    
+    return scatter, box, apy_hist, tvl_hist
+
+
+@st.cache_resource(ttl=300, max_entries=32, show_spinner=False)
+def build_protocol_radar(protocols: tuple):
+    """Build the protocol comparison radar chart, one trace per protocol in selection order"""
+    protocol_df = load_protocol_aggregates(tuple(sorted(protocols))).set_index('project')
+    
+    fig = go.Figure()
+    
+    for protocol in protocols:
+        protocol_data = protocol_df.loc[protocol]
+        
+        fig.add_trace(go.Scatterpolar(
+            r=[
+                protocol_data['liquidity_score'],
+                protocol_data['stability_score'],
+                100 - protocol_data['risk_score'],  # Invert for intuitive view
+                min(protocol_data['apy_mean'] * 10, 100)  # Scale APY
+            ],
+            theta=['Liquidity', 'Stability', 'Safety', 'Yield'],
+            fill='toself',
+            name=protocol
+        ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )
+        ),
+        showlegend=True,
+        height=500,
+        title="Protocol Risk Profile Comparison"
+    )
     
-    # Add risk level
-    def classify_risk(score):
-        if score <= 30:
-            return 'Low'
-        elif score <= 60:
-            return 'Medium'
-        else:
-            return 'High'
+    return fig
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def build_risk_factor_figures():
+    """Build the Risk Factors tab figures: risk/APY and TVL/risk scatters and the per-chain bar chart"""
+    scatter_df = thin_for_plot(load_detailed_data())
+    
+    risk_vs_apy = px.scatter(
+        scatter_df,
+        x='risk_score',
+        y='apy_mean',
+        size='tvl_mean',
+        color='chain',
+        hover_data=['project', 'symbol'],
+        labels={
+            'risk_score': 'Risk Score',
+            'apy_mean': 'Mean APY (%)'
+        },
+        title="Is higher yield worth the risk?",
+        render_mode='webgl'
+    )
+    
+    tvl_vs_risk = px.scatter(
+        scatter_df,
+        x='tvl_mean',
+        y='risk_score',
+        color='risk_level',
+        hover_data=['project', 'symbol'],
+        log_x=True,
+        color_discrete_map=RISK_COLORS,
+        labels={
+            'tvl_mean': 'TVL (USD, log scale)',
+            'risk_score': 'Risk Score'
+        },
+        title="Does higher TVL mean lower risk?",
+        render_mode='webgl'
+    )
+    
+    # Chain risk analysis
+    chain_stats = load_chain_aggregates()
+    
+    chain_bar = go.Figure()
+    
+    chain_bar.add_trace(go.Bar(
+        x=chain_stats['chain'],
+        y=chain_stats['risk_score'],
+        name='Avg Risk Score',
+        marker_color='#e74c3c'
+    ))
     
-    df['risk_level'] = df['risk_score'].apply(classify_risk)
+    chain_bar.update_layout(
+        yaxis_title="Average Risk Score",
+        xaxis_title="Chain",
+        height=400
+    )
     
-    return df
+    return risk_vs_apy, tvl_vs_risk, chain_bar
 
 
 def show():
@@ -75,48 +273,17 @@ def show():
         st.subheader("Risk Score Components")
         st.markdown("Understanding what drives the composite risk score")
         
+        scatter, box, apy_hist, tvl_hist = build_breakdown_figures()
+        
         # Component correlation heatmap
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Scatter: Liquidity vs Stability
-            fig = px.scatter(
-                df,
-                x='stability_score',
-                y='liquidity_score',
-                size='tvl_mean',
-                color='risk_level',
-                hover_data=['project', 'symbol', 'risk_score'],
-                color_discrete_map={'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'},
-                labels={
-                    'stability_score': 'Stability Score',
-                    'liquidity_score': 'Liquidity Score'
-                },
-                title="Liquidity vs Stability Analysis"
-            )
-            fig.add_shape(
-                type='line',
-                x0=0, y0=0, x1=100, y1=100,
-                line=dict(color='gray', dash='dash')
-            )
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(scatter, use_container_width=True, key='liquidity_vs_stability')
         
         with col2:
             st.markdown("### 📊 Score Distribution")
-            
-            # Box plots for scores
-            fig = go.Figure()
-            fig.add_trace(go.Box(y=df['liquidity_score'], name='Liquidity', marker_color='#3498db'))
-            fig.add_trace(go.Box(y=df['stability_score'], name='Stability', marker_color='#9b59b6'))
-            fig.add_trace(go.Box(y=df['risk_score'], name='Composite Risk', marker_color='#e74c3c'))
-            
-            fig.update_layout(
-                showlegend=False,
-                yaxis_title="Score",
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(box, use_container_width=True, key='score_distribution')
         
         st.markdown("---")
         
@@ -125,29 +292,11 @@ def show():
         
         with col1:
             st.markdown("### APY Volatility Distribution")
-            fig = px.histogram(
-                df,
-                x='apy_volatility',
-                nbins=50,
-                color='risk_level',
-                color_discrete_map={'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'},
-                labels={'apy_volatility': 'APY Standard Deviation (%)'}
-            )
-            fig.update_layout(showlegend=True, height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(apy_hist, use_container_width=True, key='apy_volatility_hist')
         
         with col2:
             st.markdown("### TVL Volatility Distribution")
-            fig = px.histogram(
-                df,
-                x='tvl_volatility',
-                nbins=50,
-                color='risk_level',
-                color_discrete_map={'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'},
-                labels={'tvl_volatility': 'TVL Coefficient of Variation (%)'}
-            )
-            fig.update_layout(showlegend=True, height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(tvl_hist, use_container_width=True, key='tvl_volatility_hist')
     
     with tab2:
         st.subheader("Protocol Comparison")
@@ -168,57 +317,22 @@ def show():
             st.warning("Please select maximum 10 protocols")
             selected_protocols = selected_protocols[:10]
         
-        # Filter data
-        protocol_df = df[df['project'].isin(selected_protocols)].groupby('project').agg({
-            'apy_mean': 'mean',
-            'risk_score': 'mean',
-            'liquidity_score': 'mean',
-            'stability_score': 'mean',
-            'tvl_mean': 'sum'
-        }).reset_index()
-        
         # Radar chart
-        fig = go.Figure()
-        
-        for protocol in selected_protocols:
-            protocol_data = protocol_df[protocol_df['project'] == protocol].iloc[0]
-            
-            fig.add_trace(go.Scatterpolar(
-                r=[
-                    protocol_data['liquidity_score'],
-                    protocol_data['stability_score'],
-                    100 - protocol_data['risk_score'],  # Invert for intuitive view
-                    min(protocol_data['apy_mean'] * 10, 100)  # Scale APY
-                ],
-                theta=['Liquidity', 'Stability', 'Safety', 'Yield'],
-                fill='toself',
-                name=protocol
-            ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 100]
-                )
-            ),
-            showlegend=True,
-            height=500,
-            title="Protocol Risk Profile Comparison"
+        st.plotly_chart(
+            build_protocol_radar(tuple(selected_protocols)),
+            use_container_width=True,
+            key='protocol_radar'
         )
-        st.plotly_chart(fig, use_container_width=True)
         
-        # Comparison table
+        # Comparison table (protocols aggregated in SQL)
         st.markdown("### Detailed Metrics")
         
-        comparison_df = protocol_df.copy()
-        comparison_df['apy_mean'] = comparison_df['apy_mean'].apply(lambda x: f"{x:.2f}%")
-        comparison_df['risk_score'] = comparison_df['risk_score'].apply(lambda x: f"{x:.1f}")
-        comparison_df['liquidity_score'] = comparison_df['liquidity_score'].apply(lambda x: f"{x:.1f}")
-        comparison_df['stability_score'] = comparison_df['stability_score'].apply(lambda x: f"{x:.1f}")
-        comparison_df['tvl_mean'] = comparison_df['tvl_mean'].apply(
-            lambda x: f"${x/1e6:.1f}M" if x < 1e9 else f"${x/1e9:.2f}B"
-        )
+        comparison_df = load_protocol_aggregates(tuple(sorted(selected_protocols)))
+        comparison_df['apy_mean'] = comparison_df['apy_mean'].map('{:.2f}%'.format)
+        comparison_df['risk_score'] = comparison_df['risk_score'].map('{:.1f}'.format)
+        comparison_df['liquidity_score'] = comparison_df['liquidity_score'].map('{:.1f}'.format)
+        comparison_df['stability_score'] = comparison_df['stability_score'].map('{:.1f}'.format)
+        comparison_df['tvl_mean'] = format_tvl(comparison_df['tvl_mean'])
         
         comparison_df.columns = ['Protocol', 'Avg APY', 'Risk Score', 'Liquidity', 'Stability', 'Total TVL']
         
@@ -228,70 +342,21 @@ def show():
         st.subheader("Risk Factor Analysis")
         st.markdown("What makes a pool risky? Explore the key factors.")
         
+        risk_vs_apy, tvl_vs_risk, chain_bar = build_risk_factor_figures()
+        
         # Correlation analysis
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("### Risk vs APY")
-            fig = px.scatter(
-                df,
-                x='risk_score',
-                y='apy_mean',
-                size='tvl_mean',
-                color='chain',
-                hover_data=['project', 'symbol'],
-                labels={
-                    'risk_score': 'Risk Score',
-                    'apy_mean': 'Mean APY (%)'
-                },
-                title="Is higher yield worth the risk?"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(risk_vs_apy, use_container_width=True, key='risk_vs_apy')
         
         with col2:
             st.markdown("### TVL vs Risk")
-            fig = px.scatter(
-                df,
-                x='tvl_mean',
-                y='risk_score',
-                color='risk_level',
-                hover_data=['project', 'symbol'],
-                log_x=True,
-                color_discrete_map={'Low': '#2ecc71', 'Medium': '#f39c12', 'High': '#e74c3c'},
-                labels={
-                    'tvl_mean': 'TVL (USD, log scale)',
-                    'risk_score': 'Risk Score'
-                },
-                title="Does higher TVL mean lower risk?"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(tvl_vs_risk, use_container_width=True, key='tvl_vs_risk')
         
         st.markdown("---")
         
         # Chain risk analysis
         st.markdown("### Risk by Chain")
-        
-        chain_stats = df.groupby('chain').agg({
-            'risk_score': 'mean',
-            'apy_mean': 'mean',
-            'tvl_mean': 'sum'
-        }).reset_index()
-        
-        chain_stats = chain_stats.sort_values('risk_score')
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Bar(
-            x=chain_stats['chain'],
-            y=chain_stats['risk_score'],
-            name='Avg Risk Score',
-            marker_color='#e74c3c'
-        ))
-        
-        fig.update_layout(
-            yaxis_title="Average Risk Score",
-            xaxis_title="Chain",
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        st.plotly_chart(chain_bar, use_container_width=True, key='chain_risk_bar')
@@ -6,11 +6,12 @@ This script is designed to be run by GitHub Actions on a schedule.
 import sys
 import os
 from datetime import datetime, timezone
+from sqlalchemy import select, update
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.database import get_session, Pool
+from src.database import get_session, ensure_indexes, wal_mode, Pool
 from src.data_collector import DataCollector, DeFiLlamaClient
 from src.risk_calculator import RiskCalculator
 
@@ -33,21 +34,23 @@ def update_current_metrics():
     
     print(f"✓ Fetched {len(all_pools)} pools from API")
     
-    # Create lookup dictionary
-    pools_dict = {p['pool']: p for p in all_pools}
+    # Only membership is needed, so keep the IDs rather than the full records
+    pool_ids = {p['pool'] for p in all_pools}
     
-    # Update pools in database
-    db_pools = session.query(Pool).all()
-    updated = 0
+    # Update pools in database with one UPDATE over the pools still listed by the API
+    db_pools = session.execute(select(Pool.id, Pool.pool_id)).all()
+    ids_to_update = [pool.id for pool in db_pools if pool.pool_id in pool_ids]
     
-    for pool in db_pools:
-        if pool.pool_id in pools_dict:
-            api_data = pools_dict[pool.pool_id]
-            pool.last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
-            updated += 1
+    if ids_to_update:
+        session.execute(
+            update(Pool)
+            .where(Pool.id.in_(ids_to_update))
+            .values(last_updated=datetime.now(timezone.utc).replace(tzinfo=None))
+        )
     
     session.commit()
-    print(f"✓ Updated {updated} pools")
+    session.close()
+    print(f"✓ Updated {len(ids_to_update)} pools")
     
     return True
 
@@ -87,33 +90,37 @@ def main():
     
     success = True
     
-    # Step 1: Update current metrics
-    if not update_current_metrics():
-        success = False
-    
-    # Step 2: Collect recent history
-    if not collect_recent_history():
-        success = False
-    
-    # Step 3: Recalculate risks
-    if not recalculate_risks():
-        success = False
-    
-    # Summary
-    print("\n" + "="*60)
-    if success:
-        print("✓ UPDATE COMPLETE!")
-    else:
-        print("⚠ UPDATE COMPLETED WITH ERRORS")
-    print("="*60)
-    
-    calculator = RiskCalculator()
-    summary = calculator.get_risk_summary()
-    
-    if len(summary) > 0:
-        print(f"\nPools with risk scores: {len(summary)}")
-        print(f"\nRisk distribution:")
-        print(summary['risk_level'].value_counts())
+    with wal_mode():
+        # Bring indexes of an existing database up to date with the models
+        ensure_indexes()
+        
+        # Step 1: Update current metrics
+        if not update_current_metrics():
+            success = False
+        
+        # Step 2: Collect recent history
+        if not collect_recent_history():
+            success = False
+        
+        # Step 3: Recalculate risks
+        if not recalculate_risks():
+            success = False
+        
+        # Summary
+        print("\n" + "="*60)
+        if success:
+            print("✓ UPDATE COMPLETE!")
+        else:
+            print("⚠ UPDATE COMPLETED WITH ERRORS")
+        print("="*60)
+        
+        calculator = RiskCalculator()
+        distribution = calculator.get_risk_distribution()
+        
+        if len(distribution) > 0:
+            print(f"\nPools with risk scores: {distribution.sum()}")
+            print(f"\nRisk distribution:")
+            print(distribution)
     
     return 0 if success else 1
 
@@ -7,12 +7,24 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from sqlalchemy import func
+
 from src.database import get_session, Pool, PoolMetric, PoolRiskScore
 from src.risk_calculator import RiskCalculator
 from datetime import datetime, timedelta, timezone
 import pandas as pd
 
 
+def count_metrics(session, pools):
+    """Metric counts for the given pools in one GROUP BY query, keyed by pool id"""
+    return dict(
+        session.query(PoolMetric.pool_id, func.count(PoolMetric.id))
+        .filter(PoolMetric.pool_id.in_([pool.id for pool in pools]))
+        .group_by(PoolMetric.pool_id)
+        .all()
+    )
+
+
 def check_database():
     """Check database contents"""
     print("="*60)
@@ -43,20 +55,23 @@ def check_database():
     avg_metrics = metric_count / pool_count if pool_count > 0 else 0
     print(f"\n📈 Average metrics per pool: {avg_metrics:.1f}")
     
-    # Check date range
-    oldest_metric = session.query(PoolMetric).order_by(PoolMetric.date).first()
-    newest_metric = session.query(PoolMetric).order_by(PoolMetric.date.desc()).first()
+    # Check date range - MIN and MAX as separate subqueries, so SQLite reads
+    # each from one end of the date index instead of scanning it
+    oldest_date, newest_date = session.query(
+        session.query(func.min(PoolMetric.date)).scalar_subquery(),
+        session.query(func.max(PoolMetric.date)).scalar_subquery()
+    ).one()
     
-    if oldest_metric and newest_metric:
-        date_range = (newest_metric.date - oldest_metric.date).days
-        print(f"📅 Data range: {oldest_metric.date.date()} to {newest_metric.date.date()} ({date_range} days)")
+    if oldest_date and newest_date:
+        date_range = (newest_date - oldest_date).days
+        print(f"📅 Data range: {oldest_date.date()} to {newest_date.date()} ({date_range} days)")
     
     # Sample some pools
     print(f"\n🔍 Sample pools:")
     sample_pools = session.query(Pool).limit(5).all()
+    counts = count_metrics(session, sample_pools)
     for pool in sample_pools:
-        pool_metrics = session.query(PoolMetric).filter_by(pool_id=pool.id).count()
-        print(f"  {pool.project} - {pool.symbol} ({pool.chain}): {pool_metrics} metrics")
+        print(f"  {pool.project} - {pool.symbol} ({pool.chain}): {counts.get(pool.id, 0)} metrics")
     
     return True
 
@@ -72,8 +87,10 @@ def test_risk_calculator():
     
     # Get pools with most metrics
     pools_with_data = []
-    for pool in session.query(Pool).limit(10).all():
-        metric_count = session.query(PoolMetric).filter_by(pool_id=pool.id).count()
+    sample_pools = session.query(Pool).limit(10).all()
+    counts = count_metrics(session, sample_pools)
+    for pool in sample_pools:
+        metric_count = counts.get(pool.id, 0)
         if metric_count >= 7:
             pools_with_data.append((pool, metric_count))
     
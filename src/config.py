@@ -14,6 +14,9 @@ MIN_TVL_USD = 100_000  # Minimum TVL to consider a pool
 MIN_APY = 0.5  # Minimum APY to consider
 MAX_APY = 200  # Maximum APY (filter outliers/scams)
 TOP_POOLS_LIMIT = 500  # Number of top pools to track initially
+HISTORY_FETCH_WORKERS = 5  # Concurrent historical data requests
+HISTORY_REQUESTS_PER_SECOND = 5  # Shared rate limit across those workers
+HISTORY_CACHE_DIR = "cache"  # Same-day cache of fetched pool histories (None disables it)
 
 # Historical Data Settings
 DAYS_OF_HISTORY = 90  # How many days of historical data to fetch
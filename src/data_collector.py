@@ -2,10 +2,18 @@
 Data collector for fetching DeFi yield data from DeFi Llama API.
 """
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import time
 
 from src.config import (
@@ -15,10 +23,120 @@ from src.config import (
     MIN_APY,
     MAX_APY,
     TOP_POOLS_LIMIT,
+    HISTORY_FETCH_WORKERS,
+    HISTORY_REQUESTS_PER_SECOND,
+    HISTORY_CACHE_DIR,
     DAYS_OF_HISTORY
 )
-from src.database import get_session, Pool, PoolMetric
-from sqlalchemy.exc import IntegrityError
+from src.database import build_upsert, get_session, Pool, PoolMetric
+from sqlalchemy import select
+
+# DeFi Llama history fields -> PoolMetric columns
+METRIC_COLUMNS = {
+    'apy': 'apy',
+    'apyBase': 'apy_base',
+    'apyReward': 'apy_reward',
+    'tvlUsd': 'tvl_usd',
+    'il7d': 'il7d',
+}
+
+# Arrow types for the metric fields of a pool's history. Fields missing from
+# the response come back as all-null columns.
+HISTORY_METRIC_FIELDS = [pa.field(api_column, pa.float64()) for api_column in METRIC_COLUMNS]
+
+
+def _parse_history_dates(strings: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    Parse ISO 8601 history timestamps into tz-aware UTC timestamps.
+    
+    Arrow parses the usual offset-suffixed strings natively. Anything it
+    rejects (timestamps without an offset, which are taken as UTC, or finer
+    than microseconds, which are truncated) goes through pandas instead.
+    
+    >>> def parse(*values):
+    ...     return [str(d) for d in _parse_history_dates(pa.chunked_array([list(values)])).to_pylist()]
+    >>> parse('2024-01-01T23:01:28.318Z', '2024-01-01T23:01:28+02:00')
+    ['2024-01-01 23:01:28.318000+00:00', '2024-01-01 21:01:28+00:00']
+    >>> parse('2024-01-01', '2024-01-01T23:01:28.318')
+    ['2024-01-01 00:00:00+00:00', '2024-01-01 23:01:28.318000+00:00']
+    >>> parse('2024-01-01T23:01:28.318123456Z')
+    ['2024-01-01 23:01:28.318123+00:00']
+    """
+    try:
+        return strings.cast(pa.timestamp('us', tz='UTC'))
+    except pa.ArrowInvalid:
+        dates = pd.to_datetime(strings.to_pandas(), utc=True, format='ISO8601')
+        return pa.chunked_array([pa.array(dates).cast(pa.timestamp('us', tz='UTC'), safe=False)])
+
+
+# Write statements are built once and executed with a list of row dicts, so
+# every batch reuses the same cached compiled SQL
+POOL_UPSERT = build_upsert(Pool, ['pool_id'], ('symbol', 'chain', 'project', 'last_updated'))
+METRIC_UPSERT = build_upsert(PoolMetric, ['pool_id', 'date'], METRIC_COLUMNS.values())
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by the history fetch workers.
+    
+    Tokens refill continuously at `rate` per second up to `capacity`, so
+    requests only wait when the workers are actually ahead of the rate
+    limit. pause() holds every worker back, e.g. for a server's Retry-After.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+    
+    def take(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                else:
+                    # Nothing accrues while paused, so a pause isn't followed by a burst
+                    elapsed = now - max(self.updated, self.resume_at)
+                    self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+                    self.updated = now
+                    
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    
+                    wait = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the next `seconds`"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class TransportRetry(Retry):
+    """
+    urllib3 retry policy for connection errors and gateway failures.
+    
+    urllib3 also retries any 429 carrying a Retry-After header by default;
+    429s are left to DeFiLlamaClient so the wait is reported and shared with
+    the other workers through the token bucket.
+    """
+    RETRY_AFTER_STATUS_CODES = frozenset([503])
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds from a numeric Retry-After header, if the server sent one"""
+    try:
+        return max(float(response.headers['Retry-After']), 0.0)
+    except (KeyError, ValueError):
+        return None
 
 
 class DeFiLlamaClient:
@@ -30,6 +148,23 @@ class DeFiLlamaClient:
         self.session = requests.Session()
         self.max_retries = 3
         self.base_delay = 1.0  # Increased from 0.5s
+        self.rate_limiter = TokenBucket(HISTORY_REQUESTS_PER_SECOND)
+        
+        # Connection errors and gateway failures are retried by urllib3 with
+        # backoff on the same kept-alive connection pool (one connection per
+        # history worker). Rate limiting (429) is handled below so that the
+        # wait is reported.
+        retry = TransportRetry(
+            total=self.max_retries,
+            backoff_factor=self.base_delay,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_maxsize=HISTORY_FETCH_WORKERS, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def get_all_pools(self) -> List[Dict]:
         """
@@ -42,7 +177,8 @@ class DeFiLlamaClient:
             response = self.session.get(f"{self.yields_url}/pools", timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            # orjson decodes the raw bytes directly (no intermediate str)
+            data = orjson.loads(response.content)
             
             # Handle both direct list and nested 'data' key
             if isinstance(data, dict) and 'data' in data:
@@ -53,41 +189,86 @@ class DeFiLlamaClient:
             print(f"✓ Fetched {len(pools)} total pools from DeFi Llama")
             return pools
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             print(f"✗ Error fetching pools: {e}")
             return []
     
-    def get_pool_historical_data(self, pool_id: str, retry_count: int = 0) -> Optional[pd.DataFrame]:
+    def get_pool_historical_data(self, pool_id: str) -> Optional[pd.DataFrame]:
         """
-        Fetch historical data for a specific pool with retry logic.
+        Fetch historical data for a specific pool, reusing today's cached copy.
+        
+        A pool's history only changes once a day, so successful responses are
+        kept on disk under HISTORY_CACHE_DIR, keyed by pool and date, and
+        reruns on the same day (e.g. after a partial failure) skip the API.
         
         Args:
             pool_id: DeFi Llama pool identifier
-            retry_count: Current retry attempt
             
         Returns:
             DataFrame with historical metrics or None if error
         """
-        try:
-            response = self.session.get(
-                f"{self.yields_url}/chart/{pool_id}",
-                timeout=30
-            )
+        if not HISTORY_CACHE_DIR:
+            return self._fetch_pool_historical_data(pool_id)
+        
+        cache_dir = Path(HISTORY_CACHE_DIR)
+        path = cache_dir / f"{pool_id}_{date.today().isoformat()}.parquet"
+        
+        if path.exists():
+            try:
+                return pd.read_parquet(path)
+            except Exception as e:
+                print(f"  ⚠ Ignoring unreadable cache file {path}: {e}")
+        
+        df = self._fetch_pool_historical_data(pool_id)
+        
+        if df is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                # Earlier days' copies of this pool are superseded
+                for stale in cache_dir.glob(f"{pool_id}_*.parquet"):
+                    stale.unlink()
+                df.to_parquet(path, compression='zstd')
+            except OSError as e:
+                print(f"  ⚠ Could not cache history for {pool_id}: {e}")
+        
+        return df
+    
+    def _fetch_pool_historical_data(self, pool_id: str) -> Optional[pd.DataFrame]:
+        """
+        Fetch historical data for a specific pool from the API with retry logic.
+        
+        Args:
+            pool_id: DeFi Llama pool identifier
             
-            # Handle rate limiting with exponential backoff
-            if response.status_code == 429:
-                if retry_count < self.max_retries:
-                    wait_time = self.base_delay * (2 ** retry_count)  # Exponential backoff
-                    print(f"  ⚠ Rate limited. Waiting {wait_time:.1f}s before retry {retry_count + 1}/{self.max_retries}")
-                    time.sleep(wait_time)
-                    return self.get_pool_historical_data(pool_id, retry_count + 1)
-                else:
+        Returns:
+            DataFrame with historical metrics or None if error
+        """
+        try:
+            for retry_count in range(self.max_retries + 1):
+                self.rate_limiter.take()
+                response = self.session.get(
+                    f"{self.yields_url}/chart/{pool_id}",
+                    timeout=30
+                )
+                
+                if response.status_code != 429:
+                    break
+                
+                if retry_count == self.max_retries:
                     print(f"  ✗ Max retries exceeded for {pool_id}")
                     return None
+                
+                # Handle rate limiting: wait as long as the server asks, falling back
+                # to exponential backoff, and hold back the other workers meanwhile
+                wait_time = _retry_after(response)
+                if wait_time is None:
+                    wait_time = self.base_delay * (2 ** retry_count)  # Exponential backoff
+                print(f"  ⚠ Rate limited. Waiting {wait_time:.1f}s before retry {retry_count + 1}/{self.max_retries}")
+                self.rate_limiter.pause(wait_time)
             
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Extract data array
             if isinstance(data, dict) and 'data' in data:
@@ -98,26 +279,19 @@ class DeFiLlamaClient:
             if not historical:
                 return None
             
-            # Convert to DataFrame
-            df = pd.DataFrame(historical)
-            
-            # Parse dates
-            if 'timestamp' in df.columns:
-                df['date'] = pd.to_datetime(df['timestamp'])
-            elif 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
+            # Load into typed Arrow columns and parse the ISO 8601 timestamps
+            # there, instead of building object columns and converting them
+            time_field = 'timestamp' if 'timestamp' in historical[0] else 'date'
+            schema = pa.schema([pa.field(time_field, pa.string()), *HISTORY_METRIC_FIELDS])
+            table = pa.Table.from_pylist(historical, schema=schema)
+            dates = _parse_history_dates(table[time_field])
             
-            return df
+            return table.drop_columns(time_field).append_column('date', dates).to_pandas()
             
         except requests.exceptions.RequestException as e:
-            if retry_count < self.max_retries:
-                wait_time = self.base_delay * (2 ** retry_count)
-                print(f"  ⚠ Error, retrying in {wait_time:.1f}s: {e}")
-                time.sleep(wait_time)
-                return self.get_pool_historical_data(pool_id, retry_count + 1)
-            else:
-                print(f"  ✗ Error fetching history for {pool_id}: {e}")
-                return None
+            # Raised once the adapter's retries are exhausted
+            print(f"  ✗ Error fetching history for {pool_id}: {e}")
+            return None
         except Exception as e:
             print(f"  ✗ Error parsing history for {pool_id}: {e}")
             return None
@@ -145,20 +319,19 @@ class DataCollector:
         print(f"\nFiltering pools...")
         print(f"  Starting with: {len(df)} pools")
         
-        # Apply filters
-        filtered = df[
-            (df['tvlUsd'] > MIN_TVL_USD) &
-            (df['apy'] > MIN_APY) &
-            (df['apy'] < MAX_APY) &
-            (df['apy'].notna()) &
-            (df['pool'].notna()) &
-            (df['project'].notna())
-        ].copy()
+        # Apply filters - the numeric bounds are evaluated as one expression
+        # (NaN APY/TVL fail the comparisons, so no separate notna() is needed)
+        mask = df.eval('tvlUsd > @MIN_TVL_USD and apy > @MIN_APY and apy < @MAX_APY')
+        mask &= df['pool'].notna() & df['project'].notna()
+        filtered = df[mask]
         
         print(f"  After TVL/APY filters: {len(filtered)} pools")
         
-        # Take top N by TVL
-        top_pools = filtered.nlargest(TOP_POOLS_LIMIT, 'tvlUsd')
+        # Take top N by TVL - partial sort, then order only the selected rows
+        tvl = filtered['tvlUsd'].to_numpy()
+        if len(tvl) > TOP_POOLS_LIMIT:
+            filtered = filtered.iloc[np.argpartition(-tvl, TOP_POOLS_LIMIT - 1)[:TOP_POOLS_LIMIT]]
+        top_pools = filtered.sort_values('tvlUsd', ascending=False)
         print(f"  Selected top {len(top_pools)} pools by TVL")
         
         return top_pools
@@ -179,43 +352,34 @@ class DataCollector:
         
         print(f"\nStoring {len(pools_df)} pools in database...")
         
-        for idx, row in pools_df.iterrows():
-            try:
-                # Check if pool exists
-                existing_pool = self.session.query(Pool).filter_by(
-                    pool_id=row['pool']
-                ).first()
-                
-                if existing_pool:
-                    # Update existing pool
-                    existing_pool.symbol = row['symbol']
-                    existing_pool.chain = row['chain']
-                    existing_pool.project = row['project']
-                    existing_pool.last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
-                    counts['updated'] += 1
-                else:
-                    # Insert new pool
-                    pool = Pool(
-                        pool_id=row['pool'],
-                        symbol=row['symbol'],
-                        chain=row['chain'],
-                        project=row['project']
-                    )
-                    self.session.add(pool)
-                    counts['inserted'] += 1
-                
-                # Commit every 50 pools
-                if (counts['inserted'] + counts['updated']) % 50 == 0:
-                    self.session.commit()
-                    print(f"  Progress: {counts['inserted']} inserted, {counts['updated']} updated")
-                    
-            except Exception as e:
-                self.session.rollback()
-                print(f"  ✗ Error storing pool {row['pool']}: {e}")
-                counts['skipped'] += 1
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        pool_ids = pools_df['pool'].tolist()
+        rows = [
+            {'pool_id': pool_id, 'symbol': symbol, 'chain': chain, 'project': project, 'last_updated': now}
+            for pool_id, symbol, chain, project in zip(
+                pool_ids,
+                pools_df['symbol'].tolist(),
+                pools_df['chain'].tolist(),
+                pools_df['project'].tolist()
+            )
+        ]
+        
+        # One lookup of the pools already stored, for the inserted/updated counts
+        existing = set(self.session.scalars(
+            select(Pool.pool_id).where(Pool.pool_id.in_(pool_ids))
+        ))
         
-        # Final commit
-        self.session.commit()
+        try:
+            # Single upsert on the unique pool_id instead of a SELECT plus INSERT/UPDATE per pool
+            if rows:
+                self.session.execute(POOL_UPSERT, rows)
+            self.session.commit()
+            counts['updated'] = len(existing)
+            counts['inserted'] = len(set(pool_ids) - existing)
+        except Exception as e:
+            self.session.rollback()
+            print(f"  ✗ Error storing pools: {e}")
+            counts['skipped'] = len(rows)
         
         print(f"\n✓ Pool storage complete:")
         print(f"  Inserted: {counts['inserted']}")
@@ -224,12 +388,12 @@ class DataCollector:
         
         return counts
     
-    def store_historical_metrics(self, pool_id: str, df_history: pd.DataFrame) -> int:
+    def store_historical_metrics(self, pool: Pool, df_history: pd.DataFrame) -> int:
         """
         Store historical metrics for a pool.
         
         Args:
-            pool_id: DeFi Llama pool identifier
+            pool: Stored Pool the metrics belong to
             df_history: DataFrame with historical data
             
         Returns:
@@ -237,76 +401,45 @@ class DataCollector:
         """
         from datetime import timezone
         
-        # Get pool database ID
-        pool = self.session.query(Pool).filter_by(pool_id=pool_id).first()
-        if not pool:
-            print(f"  ✗ Pool {pool_id} not found in database")
-            return 0
+        # History dates arrive as tz-aware UTC (see _parse_history_dates) and
+        # are stored as naive UTC (SQLite doesn't handle tz well); the zone is
+        # stripped once for the whole column
+        dates = df_history['date'].dt.tz_convert(None).to_numpy()
         
-        stored_count = 0
+        # Limit to recent history to keep DB size manageable. Comparing plain
+        # datetime64 arrays is a straight int64 comparison in NumPy (units are
+        # reconciled by the cast), skipping pandas' Timestamp comparison path
+        cutoff_date = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=DAYS_OF_HISTORY)
+        recent = dates >= np.datetime64(cutoff_date, 'us')
         
-        # Limit to recent history to keep DB size manageable
-        # Use timezone-aware datetime to match API data
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=DAYS_OF_HISTORY)
+        df_recent = df_history[recent]
         
-        # Ensure df_history dates are timezone-aware
-        if df_history['date'].dt.tz is None:
-            # If naive, localize to UTC
-            df_history['date'] = df_history['date'].dt.tz_localize('UTC')
+        if len(df_recent) == 0:
+            return 0
         
-        df_recent = df_history[df_history['date'] >= cutoff_date].copy()
+        # Build the rows from whole columns (tolist() yields plain Python scalars);
+        # NaN values and API fields missing from the response are stored as NULL
+        n = len(df_recent)
+        columns = {
+            'pool_id': [pool.id] * n,
+            'date': dates[recent].astype('datetime64[us]').tolist(),  # -> datetime objects
+        }
+        for api_column, db_column in METRIC_COLUMNS.items():
+            columns[db_column] = df_recent[api_column].tolist() if api_column in df_recent else [None] * n
         
-        for _, row in df_recent.iterrows():
-            try:
-                # Convert to naive datetime for storage (SQLite doesn't handle tz well)
-                date_value = row['date']
-                if hasattr(date_value, 'tz_localize'):
-                    # It's a pandas Timestamp
-                    date_naive = date_value.replace(tzinfo=None)
-                elif hasattr(date_value, 'replace'):
-                    # It's a datetime object
-                    date_naive = date_value.replace(tzinfo=None)
-                else:
-                    date_naive = date_value
-                
-                # Check if metric already exists
-                existing = self.session.query(PoolMetric).filter_by(
-                    pool_id=pool.id,
-                    date=date_naive
-                ).first()
-                
-                if existing:
-                    # Update existing metric
-                    existing.apy = row.get('apy')
-                    existing.apy_base = row.get('apyBase')
-                    existing.apy_reward = row.get('apyReward')
-                    existing.tvl_usd = row.get('tvlUsd')
-                    existing.il7d = row.get('il7d')
-                else:
-                    # Insert new metric
-                    metric = PoolMetric(
-                        pool_id=pool.id,
-                        date=date_naive,
-                        apy=row.get('apy'),
-                        apy_base=row.get('apyBase'),
-                        apy_reward=row.get('apyReward'),
-                        tvl_usd=row.get('tvlUsd'),
-                        il7d=row.get('il7d')
-                    )
-                    self.session.add(metric)
-                
-                stored_count += 1
-                
-            except IntegrityError:
-                self.session.rollback()
-                continue
-            except Exception as e:
-                self.session.rollback()
-                print(f"    ✗ Error storing metric: {e}")
-                continue
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        
+        try:
+            # One executemany upsert on the (pool_id, date) unique constraint instead of
+            # a SELECT plus INSERT/UPDATE per row
+            self.session.execute(METRIC_UPSERT, rows)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"    ✗ Error storing metrics: {e}")
+            return 0
         
-        self.session.commit()
-        return stored_count
+        return len(rows)
     
     def collect_historical_data(self, limit: Optional[int] = None, resume: bool = True):
         """
@@ -318,7 +451,7 @@ class DataCollector:
         """
         from datetime import timezone
         
-        pools = self.session.query(Pool).all()
+        pools = self.session.scalars(select(Pool)).all()
         
         if limit:
             pools = pools[:limit]
@@ -326,17 +459,13 @@ class DataCollector:
         # Filter out pools that already have recent data if resuming
         if resume:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
-            pools_to_process = []
             
-            for pool in pools:
-                # Check if pool has metrics from the last week
-                recent_metric = self.session.query(PoolMetric).filter(
-                    PoolMetric.pool_id == pool.id,
-                    PoolMetric.date >= cutoff_date
-                ).first()
-                
-                if not recent_metric:
-                    pools_to_process.append(pool)
+            # One query for every pool with metrics from the last week,
+            # instead of a lookup per pool
+            recent_ids = set(self.session.scalars(
+                select(PoolMetric.pool_id).where(PoolMetric.date >= cutoff_date).distinct()
+            ))
+            pools_to_process = [pool for pool in pools if pool.id not in recent_ids]
             
             if len(pools_to_process) < len(pools):
                 print(f"ℹ Resume mode: Skipping {len(pools) - len(pools_to_process)} pools with recent data")
@@ -351,35 +480,52 @@ class DataCollector:
         successful = 0
         failed = 0
         
-        for i, pool in enumerate(pools, 1):
-            print(f"\n[{i}/{len(pools)}] {pool.project} - {pool.symbol} ({pool.chain})")
-            
-            # Fetch historical data
-            df_history = self.client.get_pool_historical_data(pool.pool_id)
-            
-            if df_history is None or len(df_history) == 0:
-                print(f"  ✗ No historical data available")
-                failed += 1
-                continue
-            
-            print(f"  ✓ Fetched {len(df_history)} days of history")
+        # Network fetches run on a small thread pool and are stored as soon as
+        # each one finishes (so one slow pool doesn't hold back the rest), on
+        # the thread that owns the DB session
+        with ThreadPoolExecutor(max_workers=HISTORY_FETCH_WORKERS) as executor:
+            futures = {
+                executor.submit(self.client.get_pool_historical_data, pool.pool_id): pool
+                for pool in pools
+            }
             
-            # Store metrics
-            count = self.store_historical_metrics(pool.pool_id, df_history)
-            total_metrics += count
-            
-            if count > 0:
-                print(f"  ✓ Stored {count} metrics")
-                successful += 1
-            else:
-                failed += 1
-            
-            # Rate limiting - be nice to the API (increased delay)
-            time.sleep(1.0)  # Increased from 0.5s
-            
-            # Save progress every 10 pools
-            if i % 10 == 0:
-                print(f"\n  💾 Progress checkpoint: {i}/{len(pools)} pools processed")
+            try:
+                for i, future in enumerate(as_completed(futures), 1):
+                    pool = futures[future]
+                    print(f"\n[{i}/{len(pools)}] {pool.project} - {pool.symbol} ({pool.chain})")
+                    
+                    try:
+                        df_history = future.result()
+                    except Exception as e:
+                        print(f"  ✗ Error fetching history: {e}")
+                        failed += 1
+                        continue
+                    
+                    if df_history is None or len(df_history) == 0:
+                        print(f"  ✗ No historical data available")
+                        failed += 1
+                        continue
+                    
+                    print(f"  ✓ Fetched {len(df_history)} days of history")
+                    
+                    # Store metrics
+                    count = self.store_historical_metrics(pool, df_history)
+                    total_metrics += count
+                    
+                    if count > 0:
+                        print(f"  ✓ Stored {count} metrics")
+                        successful += 1
+                    else:
+                        failed += 1
+                    
+                    # Save progress every 10 pools
+                    if i % 10 == 0:
+                        print(f"\n  💾 Progress checkpoint: {i}/{len(pools)} pools processed")
+            except BaseException:
+                # On an error or Ctrl-C, drop the fetches still queued instead
+                # of letting the executor run them all before re-raising
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
         
         print(f"\n{'='*60}")
         print(f"Historical data collection complete!")
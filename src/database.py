@@ -2,9 +2,12 @@
 Database models and utilities for the DeFi Yield Risk Analyzer.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import create_engine, event, exc, text, Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import close_all_sessions, declarative_base, sessionmaker, relationship
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
+from contextlib import contextmanager
+from functools import lru_cache
 import os
 
 from src.config import DATABASE_PATH
@@ -58,7 +61,7 @@ class PoolMetric(Base):
     __tablename__ = 'pool_metrics_daily'
     
     id = Column(Integer, primary_key=True)
-    pool_id = Column(Integer, ForeignKey('pools.id'), nullable=False, index=True)
+    pool_id = Column(Integer, ForeignKey('pools.id'), nullable=False)
     date = Column(DateTime, nullable=False, index=True)
     apy = Column(Float)
     apy_base = Column(Float)
@@ -70,7 +73,14 @@ class PoolMetric(Base):
     pool = relationship("Pool", back_populates="metrics")
     
     # Ensure unique constraint on pool_id + date
-    __table_args__ = (UniqueConstraint('pool_id', 'date', name='_pool_date_uc'),)
+    # The covering index serves history reads (pool_id + date range, ordered by
+    # date, selecting apy/tvl_usd) from the index alone, without table lookups.
+    # Both lead with pool_id, so pool_id needs no index of its own; date keeps
+    # one for MIN/MAX(date) and date-range filters across all pools.
+    __table_args__ = (
+        UniqueConstraint('pool_id', 'date', name='_pool_date_uc'),
+        Index('ix_pool_metrics_pool_date', 'pool_id', 'date', 'apy', 'tvl_usd'),
+    )
     
     def __repr__(self):
         return f"<PoolMetric(pool_id={self.pool_id}, date={self.date}, apy={self.apy})>"
@@ -81,7 +91,7 @@ class PoolRiskScore(Base):
     __tablename__ = 'pool_risk_scores'
     
     id = Column(Integer, primary_key=True)
-    pool_id = Column(Integer, ForeignKey('pools.id'), nullable=False, index=True)
+    pool_id = Column(Integer, ForeignKey('pools.id'), nullable=False)
     calculation_date = Column(DateTime, default=datetime.utcnow)
     
     # Risk metrics (calculated from historical data)
@@ -98,21 +108,159 @@ class PoolRiskScore(Base):
     # Relationships
     pool = relationship("Pool", back_populates="risk_scores")
     
+    # One current score per pool, so recalculations can upsert on pool_id
+    __table_args__ = (
+        Index('ux_pool_risk_scores_pool_id', 'pool_id', unique=True),
+    )
+    
     def __repr__(self):
         return f"<PoolRiskScore(pool_id={self.pool_id}, risk={self.composite_risk_score})>"
 
 
 # Database connection utilities
+# Loaded objects keep their attributes across commits: the collectors commit
+# per pool while iterating pools loaded up front, and expiring them would
+# re-SELECT each pool row on its next attribute access.
+_SessionFactory = sessionmaker(expire_on_commit=False)
+
+# Applied to every new SQLite connection. The journal mode is not set here: it
+# is stored in the database file itself, so only the writer scripts switch to
+# WAL (see wal_mode) and the read-only dashboard leaves the file alone.
+# synchronous=NORMAL is durable in WAL mode and skips the fsync on each commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MB page cache (allocated as pages are read)
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped I/O
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Connection hook that applies SQLITE_PRAGMAS"""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+@lru_cache(maxsize=None)
 def get_engine(echo=False):
-    """Create and return SQLAlchemy engine"""
-    return create_engine(f'sqlite:///{DATABASE_PATH}', echo=echo)
+    """
+    Return the shared SQLAlchemy engine.
+    
+    The engine (and its connection pool) is created once per process so that
+    sessions reuse pooled connections instead of reconnecting on every call.
+    """
+    engine = create_engine(
+        f'sqlite:///{DATABASE_PATH}',
+        echo=echo,
+        pool_size=10,
+        max_overflow=20
+    )
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
 
 
 def get_session():
-    """Create and return a new database session"""
+    """
+    Create and return a new database session bound to the shared engine.
+    
+    Sessions are cheap once the engine exists, so callers get their own
+    short-lived session rather than a thread-local scoped_session: Streamlit
+    runs each rerun on a fresh thread, which would leave scoped sessions
+    behind. Read-only queries can skip the session and use
+    get_engine().connect() directly.
+    """
+    return _SessionFactory(bind=get_engine())
+
+
+# Indexes earlier versions of the models created that are now redundant
+OBSOLETE_INDEXES = (
+    'ix_pool_metrics_daily_pool_id',
+    'ix_pool_risk_scores_pool_id',  # superseded by the unique ux_pool_risk_scores_pool_id
+)
+
+
+def ensure_indexes(engine=None):
+    """
+    Bring an existing database's indexes in line with the models.
+    
+    create_all() skips tables that already exist, so indexes added to the
+    models later are created here instead, and ones since removed are dropped
+    so inserts stop maintaining them.
+    """
+    engine = engine or get_engine()
+    
+    # Keep only the newest risk score per pool so the unique index can be built
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM pool_risk_scores WHERE id NOT IN "
+            "(SELECT MAX(id) FROM pool_risk_scores GROUP BY pool_id)"
+        ))
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def build_upsert(model, index_elements, update_columns):
+    """
+    INSERT ... ON CONFLICT DO UPDATE statement for a model.
+    
+    Executed with a list of row dicts, it inserts new rows and overwrites
+    update_columns of rows that collide on the unique index_elements, all in
+    one executemany.
+    """
+    stmt = sqlite_insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+
+
+def checkpoint_database():
+    """
+    Fold the WAL back into the main database file and leave WAL mode.
+    
+    The database file is committed to the repository, so scripts that write
+    to it call this before exiting to leave every change in defi_yields.db
+    itself rather than in the -wal sidecar. Leaving WAL needs the only open
+    connection, so every session and pooled connection is closed first; if
+    one is still held elsewhere, the checkpoint alone already puts all data
+    in the file.
+    """
+    close_all_sessions()
     engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    engine.dispose()
+    
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        try:
+            conn.execute(text("PRAGMA journal_mode=DELETE"))
+        except exc.OperationalError as e:
+            print(f"⚠ Database left in WAL mode: {e}")
+
+
+@contextmanager
+def wal_mode():
+    """
+    Run a bulk write with the database in WAL journaling mode.
+    
+    WAL lets the dashboard keep reading while a script writes. The mode
+    persists in the file, so on leaving the block (even when it raised) the
+    WAL is folded back in and the file switched back by checkpoint_database().
+    """
+    with get_engine().connect() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+    
+    try:
+        yield
+    finally:
+        checkpoint_database()
 
 
 def init_database():
@@ -126,6 +274,7 @@ def init_database():
     
     engine = get_engine()
     Base.metadata.create_all(engine)
+    ensure_indexes(engine)
     
     print(f"✓ Database ready: {DATABASE_PATH}")
     print(f"✓ Tables: {', '.join(Base.metadata.tables.keys())}")
@@ -2,16 +2,112 @@
 Risk scoring calculator for DeFi yield pools.
 """
 
+import math
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
-from sqlalchemy import func
+from sqlalchemy import case, func, select
 
-from src.database import get_session, Pool, PoolMetric, PoolRiskScore
+from src.database import build_upsert, get_engine, get_session, Pool, PoolMetric, PoolRiskScore
 from src.config import RISK_WEIGHTS, RISK_LEVELS
 
 
+# Risk level of a stored score, classified in SQL: scores up to each level's
+# upper bound (inclusive) fall in that level, anything above (or NULL) is High
+RISK_LEVEL = case(
+    (PoolRiskScore.composite_risk_score <= RISK_LEVELS['low'][1], 'Low'),
+    (PoolRiskScore.composite_risk_score <= RISK_LEVELS['medium'][1], 'Medium'),
+    else_='High'
+).label('risk_level')
+
+# Columns of the risk summary queries (Pool joined to PoolRiskScore)
+SUMMARY_COLUMNS = (
+    Pool.project,
+    Pool.symbol,
+    Pool.chain,
+    PoolRiskScore.composite_risk_score.label('risk_score'),
+    PoolRiskScore.apy_mean_30d.label('apy_30d'),
+    PoolRiskScore.tvl_mean_30d.label('tvl_30d'),
+    RISK_LEVEL,
+)
+
+# Label columns of the summary frames are read as Arrow-backed strings: one
+# contiguous buffer per column instead of a Python str object per cell
+SUMMARY_DTYPES = {
+    column: pd.StringDtype('pyarrow') for column in ('project', 'symbol', 'chain', 'risk_level')
+}
+
+# Replaces a pool's stored score in place (unique on pool_id)
+RISK_SCORE_UPSERT = build_upsert(PoolRiskScore, ['pool_id'], (
+    'calculation_date',
+    'apy_volatility_30d',
+    'tvl_volatility_30d',
+    'apy_mean_30d',
+    'tvl_mean_30d',
+    'liquidity_score',
+    'stability_score',
+    'composite_risk_score',
+))
+
+
+def _valid_values(series: pd.Series) -> np.ndarray:
+    """Non-NaN values of a metric column as a float64 array (no pandas dispatch)"""
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+# Composite score weights, resolved from config once at import: stability
+# covers APY and TVL volatility together
+STABILITY_WEIGHT = float(RISK_WEIGHTS['apy_volatility'] + RISK_WEIGHTS['tvl_volatility'])
+LIQUIDITY_WEIGHT = float(RISK_WEIGHTS['liquidity'])
+
+
+def _liquidity_score_vec(mean_tvl: np.ndarray) -> np.ndarray:
+    """Liquidity score (0-100) for an array of mean TVLs"""
+    # Logarithmic scale for TVL
+    # $100k TVL = ~30 score
+    # $1M TVL = ~50 score
+    # $10M TVL = ~70 score
+    # $100M TVL = ~90 score
+    # $1B TVL = ~100 score
+    
+    # Log scale with floor at $10k
+    with np.errstate(invalid='ignore'):
+        log_tvl = np.log10(np.maximum(mean_tvl, 10_000))
+    
+    # Map log(10k) to log(1B) -> 0 to 100
+    # log(10k) = 4, log(1B) = 9, so each decade is worth 100 / (9 - 4) = 20
+    score = np.clip((log_tvl - 4) * 20.0, 0, 100)
+    
+    return np.where(mean_tvl > 0, score, 0.0)
+
+
+def _stability_score_vec(apy_std: np.ndarray, tvl_cv: np.ndarray) -> np.ndarray:
+    """Stability score (0-100) for arrays of APY std devs and TVL CVs"""
+    # APY volatility component (inverse score)
+    # 0% std = 100, 50% std = 0
+    apy_component = np.maximum(0, 100 - apy_std * 2)
+    
+    # TVL volatility component (inverse score)
+    # 0% CV = 100, 100% CV = 0
+    tvl_component = np.maximum(0, 100 - tvl_cv)
+    
+    # Weighted average (60% APY stability, 40% TVL stability)
+    return np.clip(apy_component * 0.6 + tvl_component * 0.4, 0, 100)
+
+
+def _composite_risk_score_vec(liquidity_score: np.ndarray, stability_score: np.ndarray) -> np.ndarray:
+    """Composite risk score (0-100, lower is safer) for arrays of scores"""
+    # Invert scores so lower = safer, then weight them from config
+    composite_risk = (
+        (100 - stability_score) * STABILITY_WEIGHT +
+        (100 - liquidity_score) * LIQUIDITY_WEIGHT
+    )
+    
+    return np.clip(composite_risk, 0, 100)
+
+
 class RiskCalculator:
     """Calculate risk scores for DeFi yield pools"""
     
@@ -31,22 +127,20 @@ class RiskCalculator:
         """
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         
-        metrics = self.session.query(PoolMetric).filter(
+        # Select plain columns so rows skip ORM object hydration
+        stmt = select(
+            PoolMetric.date, PoolMetric.apy, PoolMetric.tvl_usd
+        ).where(
             PoolMetric.pool_id == pool_id,
             PoolMetric.date >= cutoff_date
-        ).order_by(PoolMetric.date).all()
+        ).order_by(PoolMetric.date)
         
-        if len(metrics) < 7:  # Need at least 1 week of data
-            return None
+        rows = self.session.execute(stmt).all()
         
-        # Convert to DataFrame
-        data = [{
-            'date': m.date,
-            'apy': m.apy,
-            'tvl_usd': m.tvl_usd
-        } for m in metrics]
+        if len(rows) < 7:  # Need at least 1 week of data
+            return None
         
-        return pd.DataFrame(data)
+        return pd.DataFrame.from_records(rows, columns=['date', 'apy', 'tvl_usd'])
     
     def calculate_apy_volatility(self, df: pd.DataFrame) -> Dict[str, float]:
         """
@@ -58,14 +152,14 @@ class RiskCalculator:
         Returns:
             Dictionary with mean and std dev
         """
-        apy_values = df['apy'].dropna()
+        apy_values = _valid_values(df['apy'])
         
         if len(apy_values) < 2:
             return {'mean': 0.0, 'std': 0.0}
         
         return {
             'mean': float(apy_values.mean()),
-            'std': float(apy_values.std())
+            'std': float(apy_values.std(ddof=1))
         }
     
     def calculate_tvl_volatility(self, df: pd.DataFrame) -> Dict[str, float]:
@@ -78,13 +172,13 @@ class RiskCalculator:
         Returns:
             Dictionary with mean and coefficient of variation
         """
-        tvl_values = df['tvl_usd'].dropna()
+        tvl_values = _valid_values(df['tvl_usd'])
         
         if len(tvl_values) < 2:
             return {'mean': 0.0, 'cv': 0.0}
         
         mean_tvl = float(tvl_values.mean())
-        std_tvl = float(tvl_values.std())
+        std_tvl = float(tvl_values.std(ddof=1))
         
         # Coefficient of variation (lower is more stable)
         cv = (std_tvl / mean_tvl * 100) if mean_tvl > 0 else 0.0
@@ -105,24 +199,12 @@ class RiskCalculator:
         Returns:
             Liquidity score (0-100)
         """
-        # Logarithmic scale for TVL
-        # $100k TVL = ~30 score
-        # $1M TVL = ~50 score
-        # $10M TVL = ~70 score
-        # $100M TVL = ~90 score
-        # $1B TVL = ~100 score
-        
-        if mean_tvl <= 0:
+        # Same formula as _liquidity_score_vec, in plain floats for one pool
+        if not mean_tvl > 0:
             return 0.0
         
-        # Log scale with floor at $10k
-        log_tvl = np.log10(max(mean_tvl, 10_000))
-        
-        # Map log(10k) to log(1B) -> 0 to 100
-        # log(10k) = 4, log(1B) = 9
-        score = (log_tvl - 4) / (9 - 4) * 100
-        
-        return float(np.clip(score, 0, 100))
+        score = (math.log10(max(mean_tvl, 10_000)) - 4) * 20.0
+        return min(max(score, 0.0), 100.0)
     
     def calculate_stability_score(self, apy_std: float, tvl_cv: float) -> float:
         """
@@ -136,18 +218,12 @@ class RiskCalculator:
         Returns:
             Stability score (0-100)
         """
-        # APY volatility component (inverse score)
-        # 0% std = 100, 50% std = 0
-        apy_component = max(0, 100 - (apy_std * 2))
-        
-        # TVL volatility component (inverse score)
-        # 0% CV = 100, 100% CV = 0
-        tvl_component = max(0, 100 - tvl_cv)
+        # Same formula as _stability_score_vec, in plain floats for one pool
+        apy_component = max(0.0, 100 - apy_std * 2)
+        tvl_component = max(0.0, 100 - tvl_cv)
         
-        # Weighted average (60% APY stability, 40% TVL stability)
-        stability_score = apy_component * 0.6 + tvl_component * 0.4
-        
-        return float(np.clip(stability_score, 0, 100))
+        score = apy_component * 0.6 + tvl_component * 0.4
+        return min(max(score, 0.0), 100.0)
     
     def calculate_composite_risk_score(
         self, 
@@ -165,17 +241,13 @@ class RiskCalculator:
         Returns:
             Composite risk score (0-100, lower is safer)
         """
-        # Invert scores so lower = safer
-        liquidity_risk = 100 - liquidity_score
-        stability_risk = 100 - stability_score
-        
-        # Weighted combination from config
+        # Same formula as _composite_risk_score_vec, in plain floats for one pool
         composite_risk = (
-            stability_risk * (RISK_WEIGHTS['apy_volatility'] + RISK_WEIGHTS['tvl_volatility']) +
-            liquidity_risk * RISK_WEIGHTS['liquidity']
+            (100 - stability_score) * STABILITY_WEIGHT +
+            (100 - liquidity_score) * LIQUIDITY_WEIGHT
         )
         
-        return float(np.clip(composite_risk, 0, 100))
+        return min(max(composite_risk, 0.0), 100.0)
     
     def calculate_risk_for_pool(self, pool: Pool) -> Optional[PoolRiskScore]:
         """
@@ -187,10 +259,10 @@ class RiskCalculator:
         Returns:
             PoolRiskScore object or None if insufficient data
         """
-        # Get 30 days of historical data
+        # Get 30 days of historical data (None below a week of rows)
         df = self.get_pool_metrics_df(pool.id, days=30)
         
-        if df is None or len(df) < 7:
+        if df is None:
             return None
         
         # Calculate metrics
@@ -216,52 +288,155 @@ class RiskCalculator:
         
         return risk_score
     
+    def calculate_batch_scores(
+        self,
+        apy_std: np.ndarray,
+        tvl_mean: np.ndarray,
+        tvl_std: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate risk scores for many pools at once.
+        
+        Takes one aggregate per pool and scores every pool with the same
+        whole-array functions behind the per-pool score methods above, instead
+        of a chain of scalar calls per pool.
+        
+        Args:
+            apy_std: Standard deviation of APY per pool
+            tvl_mean: Mean TVL in USD per pool
+            tvl_std: Standard deviation of TVL per pool
+            
+        Returns:
+            Dictionary of 1D arrays (one value per pool): tvl_cv,
+            liquidity_score, stability_score, composite_risk_score
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tvl_cv = np.where(tvl_mean > 0, tvl_std / tvl_mean * 100, 0.0)
+        
+        liquidity = _liquidity_score_vec(tvl_mean)
+        stability = _stability_score_vec(apy_std, tvl_cv)
+        composite = _composite_risk_score_vec(liquidity, stability)
+        
+        return {
+            'tvl_cv': tvl_cv,
+            'liquidity_score': liquidity,
+            'stability_score': stability,
+            'composite_risk_score': composite
+        }
+    
+    def get_metric_stats(self, days: int = 30) -> pd.DataFrame:
+        """
+        Aggregate every pool's recent metrics in SQL.
+        
+        One query returns a row per pool, so only the aggregates leave the
+        database rather than every metric row. SQLite has no STDDEV, so the
+        query takes per-pool means first and then sums squared deviations
+        from them (two passes, which avoids the cancellation of sum-of-squares).
+        
+        Args:
+            days: Number of days of history to aggregate
+            
+        Returns:
+            DataFrame indexed by pool_id with the row count (n) and mean/std of
+            APY and TVL. Like the per-pool volatility methods, mean and std are
+            0 where fewer than two values are present.
+        """
+        cutoff_date = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+        recent = PoolMetric.date >= cutoff_date
+        
+        # COUNT/AVG of a column skip its NULLs, like pandas count()/mean()
+        means = select(
+            PoolMetric.pool_id,
+            func.count().label('n'),
+            func.count(PoolMetric.apy).label('apy_count'),
+            func.avg(PoolMetric.apy).label('apy_mean'),
+            func.count(PoolMetric.tvl_usd).label('tvl_count'),
+            func.avg(PoolMetric.tvl_usd).label('tvl_mean')
+        ).where(recent).group_by(PoolMetric.pool_id).cte('means')
+        
+        apy_dev = PoolMetric.apy - means.c.apy_mean
+        tvl_dev = PoolMetric.tvl_usd - means.c.tvl_mean
+        
+        query = select(
+            *means.c,
+            func.sum(apy_dev * apy_dev).label('apy_ss'),
+            func.sum(tvl_dev * tvl_dev).label('tvl_ss')
+        ).join_from(
+            means, PoolMetric, PoolMetric.pool_id == means.c.pool_id
+        ).where(recent).group_by(*means.c)
+        
+        stats = pd.read_sql(query, get_engine(), index_col='pool_id')
+        
+        for prefix in ('apy', 'tvl'):
+            count = stats[f'{prefix}_count'].to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                std = np.sqrt(stats[f'{prefix}_ss'].to_numpy(dtype=np.float64) / (count - 1))
+            
+            too_few = count < 2
+            stats[f'{prefix}_mean'] = np.where(too_few, 0.0, stats[f'{prefix}_mean'].to_numpy(dtype=np.float64))
+            stats[f'{prefix}_std'] = np.where(too_few, 0.0, std)
+        
+        return stats[['n', 'apy_mean', 'apy_std', 'tvl_mean', 'tvl_std']]
+    
     def calculate_all_risks(self):
         """Calculate risk scores for all pools with sufficient data"""
-        pools = self.session.query(Pool).all()
+        pool_count = self.session.scalar(select(func.count(Pool.id)))
         
         print("="*60)
         print("CALCULATING RISK SCORES")
         print("="*60)
-        print(f"\nProcessing {len(pools)} pools...")
+        print(f"\nProcessing {pool_count} pools...")
         
         calculated = 0
-        skipped = 0
         errors = 0
         
-        for i, pool in enumerate(pools, 1):
-            try:
-                # Check if pool has enough data
-                metric_count = self.session.query(PoolMetric).filter_by(pool_id=pool.id).count()
-                
-                if metric_count < 7:
-                    skipped += 1
-                    continue
-                
-                # Calculate risk score
-                risk_score = self.calculate_risk_for_pool(pool)
-                
-                if risk_score is None:
-                    skipped += 1
-                    continue
-                
-                # Delete old risk scores for this pool
-                self.session.query(PoolRiskScore).filter_by(pool_id=pool.id).delete()
-                
-                # Add new risk score
-                self.session.add(risk_score)
-                self.session.commit()
-                
-                calculated += 1
-                
-                if calculated % 50 == 0:
-                    print(f"  Progress: {calculated} calculated, {skipped} skipped")
-                
-            except Exception as e:
-                errors += 1
-                self.session.rollback()
-                if errors <= 5:  # Show first 5 errors
-                    print(f"  ✗ Error calculating risk for {pool.project} - {pool.symbol}: {e}")
+        # Aggregate all pools' 30-day histories at once; pools need at least
+        # a week of data to be scored
+        stats = self.get_metric_stats(days=30)
+        stats = stats[stats['n'] >= 7]
+        skipped = pool_count - len(stats)
+        
+        scores = self.calculate_batch_scores(
+            stats['apy_std'].to_numpy(),
+            stats['tvl_mean'].to_numpy(),
+            stats['tvl_std'].to_numpy()
+        )
+        
+        calculation_date = datetime.now(timezone.utc).replace(tzinfo=None)
+        records = [
+            {
+                'pool_id': pool_id,
+                'calculation_date': calculation_date,
+                'apy_volatility_30d': apy_std,
+                'tvl_volatility_30d': tvl_cv,
+                'apy_mean_30d': apy_mean,
+                'tvl_mean_30d': tvl_mean,
+                'liquidity_score': liquidity,
+                'stability_score': stability,
+                'composite_risk_score': composite
+            }
+            for pool_id, apy_std, tvl_cv, apy_mean, tvl_mean, liquidity, stability, composite in zip(
+                stats.index.tolist(),
+                stats['apy_std'].tolist(),
+                scores['tvl_cv'].tolist(),
+                stats['apy_mean'].tolist(),
+                stats['tvl_mean'].tolist(),
+                scores['liquidity_score'].tolist(),
+                scores['stability_score'].tolist(),
+                scores['composite_risk_score'].tolist()
+            )
+        ]
+        
+        # Replace the old scores of every scored pool with one upsert
+        try:
+            if records:
+                self.session.execute(RISK_SCORE_UPSERT, records)
+            self.session.commit()
+            calculated = len(records)
+        except Exception as e:
+            self.session.rollback()
+            errors = len(records)
+            print(f"  ✗ Error storing risk scores: {e}")
         
         print(f"\n{'='*60}")
         print(f"Risk calculation complete!")
@@ -275,37 +450,53 @@ class RiskCalculator:
         Get summary of risk scores across all pools.
         
         Returns:
-            DataFrame with risk distribution
+            DataFrame with one row per scored pool, including its risk level
         """
-        # Query all risk scores with pool info
-        results = self.session.query(
-            Pool.project,
-            Pool.symbol,
-            Pool.chain,
-            PoolRiskScore.composite_risk_score,
-            PoolRiskScore.apy_mean_30d,
-            PoolRiskScore.tvl_mean_30d
-        ).join(
+        # Query all risk scores with pool info; pandas builds the frame straight
+        # from the cursor, on its own pooled connection rather than self.session
+        query = select(*SUMMARY_COLUMNS).join(
             PoolRiskScore, Pool.id == PoolRiskScore.pool_id
-        ).all()
+        )
         
-        df = pd.DataFrame(results, columns=[
-            'project', 'symbol', 'chain', 
-            'risk_score', 'apy_30d', 'tvl_30d'
-        ])
+        return pd.read_sql(query, get_engine(), dtype=SUMMARY_DTYPES)
+    
+    def get_risk_distribution(self) -> pd.Series:
+        """
+        Count scored pools per risk level, grouped in SQL.
         
-        # Add risk level classification
-        def classify_risk(score):
-            if score <= RISK_LEVELS['low'][1]:
-                return 'Low'
-            elif score <= RISK_LEVELS['medium'][1]:
-                return 'Medium'
-            else:
-                return 'High'
+        Returns:
+            Series of pool counts indexed by risk level, largest first
+            (shaped like value_counts() on the summary's risk_level column)
+        """
+        count = func.count().label('count')
+        query = select(RISK_LEVEL, count).group_by(RISK_LEVEL).order_by(count.desc())
         
-        df['risk_level'] = df['risk_score'].apply(classify_risk)
+        with get_engine().connect() as conn:
+            rows = conn.execute(query).all()
+        
+        return pd.Series(
+            [n for _, n in rows],
+            index=pd.Index([level for level, _ in rows], name='risk_level'),
+            name='count'
+        )
+    
+    def get_ranked_pools(self, limit: int = 10, riskiest: bool = False) -> pd.DataFrame:
+        """
+        Get the safest (or riskiest) scored pools, ordered and limited in SQL.
+        
+        Args:
+            limit: Number of pools to return
+            riskiest: If True, return the highest risk scores instead of the lowest
+            
+        Returns:
+            DataFrame with the same columns as get_risk_summary()
+        """
+        score = PoolRiskScore.composite_risk_score
+        query = select(*SUMMARY_COLUMNS).join(
+            PoolRiskScore, Pool.id == PoolRiskScore.pool_id
+        ).order_by(score.desc() if riskiest else score).limit(limit)
         
-        return df
+        return pd.read_sql(query, get_engine(), dtype=SUMMARY_DTYPES)
 
 
 if __name__ == "__main__":
@@ -318,15 +509,15 @@ if __name__ == "__main__":
     print("RISK SUMMARY")
     print("="*60)
     
-    summary = calculator.get_risk_summary()
+    distribution = calculator.get_risk_distribution()
     
-    if len(summary) > 0:
-        print(f"\nTotal pools with risk scores: {len(summary)}")
+    if len(distribution) > 0:
+        print(f"\nTotal pools with risk scores: {distribution.sum()}")
         print(f"\nRisk distribution:")
-        print(summary['risk_level'].value_counts())
+        print(distribution)
         
         print(f"\nTop 10 safest pools (lowest risk):")
-        print(summary.nsmallest(10, 'risk_score')[['project', 'symbol', 'risk_score', 'apy_30d']])
+        print(calculator.get_ranked_pools(10)[['project', 'symbol', 'risk_score', 'apy_30d']])
         
         print(f"\nTop 10 riskiest pools:")
-        print(summary.nlargest(10, 'risk_score')[['project', 'symbol', 'risk_score', 'apy_30d']])
\ No newline at end of file
+        print(calculator.get_ranked_pools(10, riskiest=True)[['project', 'symbol', 'risk_score', 'apy_30d']])
\ No newline at end of file